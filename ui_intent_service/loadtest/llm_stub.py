@@ -0,0 +1,128 @@
+"""
+Local stand-in for the chat-completions API, for load tests.
+
+Answers POST /v1/chat/completions (plain and "stream": true) with canned but
+schema-valid JSON: marketing copy for /generate-copy prompts and a portfolio
+for resume prompts. Latency and failures are drawn per request:
+  - latency: lognormal around --latency-ms (spread --latency-sigma)
+  - --error-rate: fraction answered with HTTP 500
+  - --timeout-rate: fraction that hang for --hang-seconds (clients time out)
+
+Usage: python -m loadtest.llm_stub --port 9900 --latency-ms 800 --error-rate 0.02
+Point the service at it with LLM_BASE_URL=http://127.0.0.1:9900/v1.
+"""
+import os
+import re
+import json
+import random
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+COPY_RESPONSE = {
+    "hero": {"heading": "Banking that keeps up with you", "subheading": "Real-time insight into every account.", "cta": "Get started"},
+    "featuresRow": [
+        {"title": "Instant transfers", "description": "Move money in seconds, not days."},
+        {"title": "Smart budgets", "description": "Spending limits that adapt to your month."},
+    ],
+    "kpiTiles": [{"label": "Uptime", "value": "99.99%"}, {"label": "Users", "value": "2M+"}],
+}
+
+PORTFOLIO_RESPONSE = {
+    "personal": {"name": "Jordan Lee", "headline": "I build tools that make data feel simple.",
+                 "location": "Berlin, Germany", "social_links": {"github": "https://github.com/jordanlee"}},
+    "about": "I'm a full-stack engineer who loves turning messy data into clear products.",
+    "featured_projects": [
+        {"title": "Ledger", "one_liner": "An open-source budgeting app with bank sync.", "impact": "40k users", "tech_stack": ["React", "Go"]},
+        {"title": "Pulse", "one_liner": "Realtime metrics dashboard for small teams.", "impact": None, "tech_stack": ["Svelte", "Python"]},
+    ],
+    "experience": [
+        {"role": "Senior Engineer", "company": "Acme", "period": "2021 — Present",
+         "impact_line": "Cut report generation time by 60% for 300 enterprise customers.", "tech": ["Python", "Postgres"]},
+    ],
+    "education": [{"institution": "TU Berlin", "degree": "BSc Computer Science", "year": "2018"}],
+    "skills": [{"category": "Languages", "items": ["Python", "Go", "TypeScript"]}],
+}
+
+
+def create_app(latency_ms: float, latency_sigma: float, error_rate: float, timeout_rate: float,
+               hang_seconds: float, stream_chunk_chars: int, seed: int | None = None) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    rng = random.Random(seed)
+    counters = {"requests": 0, "errors": 0, "hangs": 0}
+
+    def draw_latency() -> float:
+        if latency_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(0.0, latency_sigma) * latency_ms / 1000.0
+
+    @app.get("/stats")
+    def stats():
+        return counters
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["requests"] += 1
+
+        roll = rng.random()
+        if roll < timeout_rate:
+            counters["hangs"] += 1
+            await asyncio.sleep(hang_seconds)
+        elif roll < timeout_rate + error_rate:
+            counters["errors"] += 1
+            await asyncio.sleep(draw_latency() / 4)
+            return JSONResponse(status_code=500, content={"error": {"message": "stub: injected failure"}})
+
+        system_prompt = body["messages"][0]["content"]
+        content = COPY_RESPONSE if "marketing copy" in system_prompt else PORTFOLIO_RESPONSE
+        # Chunked resume calls ask for "part i of n"; vary the project so merging has work to do
+        part = re.search(r"part (\d+) of (\d+)", body["messages"][-1]["content"])
+        if part and content is PORTFOLIO_RESPONSE:
+            content = dict(content, featured_projects=content["featured_projects"] + [
+                {"title": f"Project {part.group(1)}", "one_liner": "A chunk-specific project.", "tech_stack": ["Rust"]}
+            ])
+        text = json.dumps(content)
+        latency = draw_latency()
+
+        if body.get("stream"):
+            pieces = [text[i:i + stream_chunk_chars] for i in range(0, len(text), stream_chunk_chars)]
+            delay = latency / max(1, len(pieces))
+
+            async def events():
+                for piece in pieces:
+                    await asyncio.sleep(delay)
+                    yield "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}) + "\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat-completions stub for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9900)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="median response latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.35, help="lognormal spread (0 = fixed latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument("--stream-chunk-chars", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(args.latency_ms, args.latency_sigma, args.error_rate, args.timeout_rate,
+                     args.hang_seconds, args.stream_chunk_chars, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level=os.getenv("LLM_STUB_LOG_LEVEL", "warning"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+End-to-end load harness.
+
+Starts the LLM stub and the service (uvicorn main:app, or serve.py with
+--workers), waits for /health/ready, then drives a weighted mix of
+/predict, /plan, /generate-copy, /parse-resume and /upload with a closed
+loop of N concurrent clients for each concurrency level. Prints a table and
+writes machine-readable JSON (throughput, error counts, p50/p95/p99 per
+endpoint and level) so runs can be diffed.
+
+Usage (from ui_intent_service/):
+  python -m loadtest.run_load --concurrency 1,8,32 --duration 20 --out results.json
+  python -m loadtest.run_load --base-url http://127.0.0.1:8000   # existing server, no spawning
+"""
+import os
+import sys
+import csv
+import math
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "predict=35,plan=30,generate-copy=15,parse-resume=10,upload=10"
+LAYOUT_SECTIONS = {
+    "landing": ["hero", "featuresRow", "bentoGrid"],
+    "dashboard": ["kpiTiles", "splitReveal"],
+    "portfolio": ["fullscreenHero", "bentoGrid"],
+}
+
+RESUME_LINES = [
+    "Jordan Lee", "Senior Software Engineer - Berlin", "jordan@example.com | github.com/jordanlee", "",
+    "EXPERIENCE",
+    "Acme Corp - Senior Engineer (2021 - Present)",
+    "Led the reporting platform rewrite, cutting generation time by 60% for 300 enterprise customers.",
+    "Mentored four engineers and introduced contract testing across 12 services.",
+    "Globex - Software Engineer (2018 - 2021)",
+    "Built the realtime metrics pipeline processing 2B events per day with Kafka and Go.",
+    "", "PROJECTS",
+    "Ledger - open-source budgeting app with bank sync, 40k monthly users (React, Go).",
+    "Pulse - realtime metrics dashboard for small teams (Svelte, Python).",
+    "", "EDUCATION", "TU Berlin - BSc Computer Science, 2018",
+    "", "SKILLS", "Python, Go, TypeScript, React, Postgres, Kafka, Kubernetes",
+]
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def load_prompts(path: str) -> list:
+    with open(path, newline="") as f:
+        return [row["text"] for row in csv.DictReader(f) if row.get("text")]
+
+
+def make_resume_pdf(lines: list) -> bytes:
+    """Minimal single-page text PDF (no PDF library needed)."""
+    def escape(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    stream = "".join(f"BT /F1 10 Tf 40 {760 - 14 * i} Td ({escape(line)}) Tj ET\n" for i, line in enumerate(lines))
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}endstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out, offsets = "%PDF-1.4\n", []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+class Workload:
+    """Builds one request per endpoint. Inputs are varied so caches see realistic, not perfect, reuse."""
+    def __init__(self, prompts: list, rng: random.Random, unique_resumes: bool):
+        self.prompts = prompts
+        self.rng = rng
+        self.unique_resumes = unique_resumes
+
+    def _resume_lines(self) -> list:
+        lines = list(RESUME_LINES)
+        if self.unique_resumes:
+            lines.append(f"Reference id {self.rng.getrandbits(64):016x}")
+        return lines
+
+    async def send(self, client: httpx.AsyncClient, endpoint: str) -> httpx.Response:
+        prompt = self.rng.choice(self.prompts)
+        if endpoint == "predict":
+            return await client.post("/predict", json={"prompt": prompt})
+        if endpoint == "plan":
+            seed = self.rng.choice([None, self.rng.randrange(1000)])
+            return await client.post("/plan", json={"prompt": prompt, "seed": seed})
+        if endpoint == "generate-copy":
+            layout = self.rng.choice(list(LAYOUT_SECTIONS))
+            return await client.post("/generate-copy", json={
+                "prompt": prompt, "layout_mode": layout, "sections": LAYOUT_SECTIONS[layout],
+            })
+        if endpoint == "parse-resume":
+            return await client.post("/parse-resume", json={"resume_text": "\n".join(self._resume_lines())})
+        if endpoint == "upload":
+            pdf = make_resume_pdf(self._resume_lines())
+            return await client.post("/upload", files={"file": ("resume.pdf", pdf, "application/pdf")})
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def is_failure(endpoint: str, response: httpx.Response) -> bool:
+    if response.status_code >= 400:
+        return True
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    if not isinstance(body, dict):
+        return False
+    # These endpoints report failures with HTTP 200: /generate-copy returns {} on an
+    # LLM error or timeout, /parse-resume and /upload an error status or no data
+    if endpoint == "generate-copy":
+        return not body
+    if endpoint in ("parse-resume", "upload"):
+        return body.get("status") == "error" or not body.get("data")
+    return False
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    rank = math.ceil(q / 100.0 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    latencies = sorted(s[1] for s in samples)
+    statuses = {}
+    for _, _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": len(samples),
+        "failures": sum(1 for s in samples if s[3]),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "status_codes": statuses,
+    }
+
+
+async def run_level(base_url: str, workload: Workload, mix: dict, concurrency: int,
+                    duration: float, warmup: float, timeout: float) -> dict:
+    """Closed loop: `concurrency` clients each send back-to-back requests until the deadline."""
+    names, weights = list(mix), list(mix.values())
+    samples = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        deadline = measure_from + duration
+
+        async def client_loop():
+            while loop.time() < deadline:
+                endpoint = workload.rng.choices(names, weights)[0]
+                start = loop.time()
+                try:
+                    response = await workload.send(client, endpoint)
+                    status, failed = response.status_code, is_failure(endpoint, response)
+                except httpx.HTTPError as e:
+                    status, failed = type(e).__name__, True
+                end = loop.time()
+                if start >= measure_from and end <= deadline:
+                    samples.append((endpoint, end - start, status, failed))
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+    by_endpoint = {name: summarize([s for s in samples if s[0] == name], duration) for name in names}
+    return {"concurrency": concurrency, "duration_s": duration, "overall": summarize(samples, duration),
+            "endpoints": by_endpoint}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base_url: str, timeout: float, process: subprocess.Popen | None = None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Process exited early with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{base_url} not ready after {timeout:.0f}s")
+
+
+def start_processes(args, workdir: str) -> tuple:
+    stub_port, app_port = free_port(), free_port()
+    stub_cmd = [
+        sys.executable, "-m", "loadtest.llm_stub", "--port", str(stub_port),
+        "--latency-ms", str(args.stub_latency_ms), "--latency-sigma", str(args.stub_latency_sigma),
+        "--error-rate", str(args.stub_error_rate), "--timeout-rate", str(args.stub_timeout_rate),
+    ]
+    if args.seed is not None:
+        stub_cmd += ["--seed", str(args.seed)]
+
+    env = dict(os.environ)
+    env.update({
+        "LLM_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+        "LLM_API_KEY": env.get("LLM_API_KEY", "loadtest"),
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "JOB_SPOOL_DIR": os.path.join(workdir, "job_uploads"),
+        "RESUME_CACHE_PATH": os.path.join(workdir, "resume_cache.sqlite3") if args.keep_caches else "",
+    })
+    if args.workers > 1:
+        app_cmd = [sys.executable, "serve.py", "--workers", str(args.workers), "--host", "127.0.0.1",
+                   "--port", str(app_port), "--log-level", "warning"]
+    else:
+        app_cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                   "--port", str(app_port), "--log-level", "warning"]
+
+    log = open(os.path.join(workdir, "service.log"), "w")
+    stub = subprocess.Popen(stub_cmd, cwd=SERVICE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    app = subprocess.Popen(app_cmd, cwd=SERVICE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return stub, app, f"http://127.0.0.1:{app_port}"
+
+
+def print_table(levels: list):
+    header = f"{'conc':>5} {'endpoint':<14} {'reqs':>6} {'fail':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        rows = list(level["endpoints"].items()) + [("ALL", level["overall"])]
+        for name, s in rows:
+            print(f"{level['concurrency']:>5} {name:<14} {s['requests']:>6} {s['failures']:>5} {s['throughput_rps']:>8} "
+                  f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the UI Intent Service against a local LLM stub")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts, one run each")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds at the start of each level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight pairs")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client request timeout")
+    parser.add_argument("--base-url", default=None, help="target an already-running service instead of spawning one")
+    parser.add_argument("--workers", type=int, default=1, help="> 1 starts serve.py with this many workers")
+    parser.add_argument("--stub-latency-ms", type=float, default=800.0)
+    parser.add_argument("--stub-latency-sigma", type=float, default=0.35)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-timeout-rate", type=float, default=0.0)
+    parser.add_argument("--keep-caches", action="store_true", help="leave resume caches on (default: cold)")
+    parser.add_argument("--repeat-resumes", action="store_true", help="send the same resume every time")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    workload = Workload(
+        load_prompts(os.path.join(SERVICE_DIR, "data", "train.csv")),
+        random.Random(args.seed),
+        unique_resumes=not args.repeat_resumes,
+    )
+
+    processes = []
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    try:
+        if args.base_url:
+            base_url = args.base_url.rstrip("/")
+            wait_ready(base_url, args.ready_timeout)
+        else:
+            stub, app, base_url = start_processes(args, workdir)
+            processes = [app, stub]
+            print(f"Started service at {base_url} (logs: {workdir}/service.log); waiting for readiness...")
+            wait_ready(base_url, args.ready_timeout, app)
+
+        results = []
+        for concurrency in levels:
+            print(f"Running {args.duration:.0f}s at concurrency {concurrency}...")
+            results.append(asyncio.run(run_level(
+                base_url, workload, mix, concurrency, args.duration, args.warmup, args.timeout,
+            )))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform()},
+        "config": {k: v for k, v in vars(args).items() if k != "out"} | {"mix": mix},
+        "levels": results,
+    }
+    print_table(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
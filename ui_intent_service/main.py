@@ -1,18 +1,66 @@
+import os
+import json
+import time
+import random
+import hashlib
+import functools
+import threading
+from contextlib import asynccontextmanager
 import torch
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 
-from models.encoder import encode_text
-from models.ui_intent_model import UIIntentModel
+from models import encoder
+from models.encoder import encode_text, encode_texts
+from models import intent_heads
+from models.intent_heads import device, get_intent_model, get_fused_heads, model_version
+from models.fused_heads import CATEGORY_SLICE, COMPLEXITY_SLICE, COMPONENTS_SLICE
+from models.cascade import get_cascade, CASCADE_MIN_CONFIDENCE
 from training.dataset import DEFAULT_CATEGORY_MAP, DEFAULT_COMPLEXITY_MAP, DEFAULT_COMPONENTS
-from planner.ui_planner import generate_ui_plan
+from planner.ui_planner import generate_ui_plan, match_prompt_keywords, apply_keyword_overrides, PLANNER_VERSION
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
-from services.llm_client import generate_marketing_copy
-from services.resume_parser import parse_resume_to_portfolio, extract_text_from_pdf, cleanse_text
+from services.llm_client import generate_marketing_copy, stream_marketing_copy, CopyStreamIncomplete
+from services.llm_transport import llm_transport
+from services.resume_parser import parse_resume_to_portfolio, extract_resume_text, cleanse_text, RESUME_TEXT_MAX_CHARS, PDF_MAX_PAGES
+from services import pdf_extract
+from services.resume_cache import resume_cache
+from services.batch_scheduler import MicroBatchScheduler
+from services.inference_executor import InferenceExecutor, Overloaded
+from services.plan_cache import PlanCache
+from services.copy_cache import SemanticCopyCache
+from services.job_queue import JobStore, JobQueue, JOB_SPOOL_DIR, TERMINAL_STATUSES
+from services import metrics
+from services.metrics import stage
+from services.profiling import ServerTimingMiddleware, RequestCounter, SamplingProfiler
+from services.heads_reloader import HeadsReloader, HeadsValidationError
+
+# Set once the encoder and heads are loaded and warmed up
+models_ready = threading.Event()
+startup_error: str | None = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load + warm up off the event loop so liveness answers immediately;
+    # readiness flips once every inference path has run once.
+    if os.getenv("PRELOAD_MODELS", "1") == "1":
+        app.state.warmup_task = asyncio.create_task(asyncio.to_thread(load_and_warm_up))
+    else:
+        models_ready.set()
+    await job_queue.start()
+    heads_reloader.start()
+    yield
+    heads_reloader.stop()
+    await job_queue.stop()
+    intent_scheduler.stop()
+    inference_executor.shutdown()
+    pdf_extract.shutdown_pool()
+    resume_cache.close()
+    await llm_transport.aclose()
 
 # Initialize FastAPI app
-app = FastAPI(title="UI Intent Service")
+app = FastAPI(title="UI Intent Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,22 +68,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "Retry-After"],
 )
 
-# Setup inference device
-device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
-
-# Load intent model
-model = UIIntentModel(input_size=384)
-# Load trained weights
-weights_path = "models/ui_intent_heads.pt"
-try:
-    model.load_state_dict(torch.load(weights_path, map_location=device, weights_only=True))
-    print("Loaded trained model weights.")
-except FileNotFoundError:
-    print("Warning: Trained weights not found. Using untrained initialization.")
-model = model.to(device)
-model.eval()
+# Per-request stage breakdown in a Server-Timing header (visible in browser devtools)
+request_counter = RequestCounter()
+if os.getenv("SERVER_TIMING", "1") == "1":
+    app.add_middleware(ServerTimingMiddleware, request_counter=request_counter)
 
 # Inverse maps for decoding inferences
 INV_CATEGORY_MAP = {v: k for k, v in DEFAULT_CATEGORY_MAP.items()}
@@ -48,117 +87,491 @@ class PlanRequest(BaseModel):
     prompt: str
     seed: int | None = None
 
+class PredictBatchRequest(BaseModel):
+    prompts: list[str]
+
+class PlanBatchRequest(BaseModel):
+    prompts: list[str]
+    seeds: list[int | None] | None = None
+
+# Limits for /predict/batch and /plan/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+ENCODE_BUCKET_SIZE = int(os.getenv("ENCODE_BUCKET_SIZE", "32"))
+
 class GenerateCopyRequest(BaseModel):
     prompt: str
     layout_mode: str
     sections: list
 
+@app.get("/stats")
+def service_stats():
+    """Cache and queue counters for the inference and copy paths."""
+    return {
+        "embedding_cache": encoder.cache_stats(),
+        "plan_cache": plan_cache.stats(),
+        "copy_cache": copy_cache.stats(),
+        "resume_cache": resume_cache.stats(),
+        "inference_executor": inference_executor.stats(),
+        "jobs": job_queue.stats(),
+        "intent_heads": heads_reloader.status(),
+        "cascade": cascade_stats(),
+    }
+
+def _cache_events() -> dict:
+    # Read from each cache's own counters at scrape time; nothing extra on the hot path
+    embedding = encoder.cache_stats()
+    sources = {
+        "embedding_memory": embedding["memory"],
+        "embedding_disk": embedding["disk"],
+        "plan": plan_cache.stats(),
+        "copy": copy_cache.stats(),
+    }
+    resume = resume_cache.stats()
+    for level in ("pdf_text", "portfolio"):
+        sources[f"resume_{level}"] = {"hits": resume["hits"][level], "misses": resume["misses"][level]}
+    samples = {}
+    for name, stats in sources.items():
+        if stats is not None:
+            samples[(name, "hit")] = stats["hits"]
+            samples[(name, "miss")] = stats["misses"]
+    return samples
+
+def _queue_depths() -> dict:
+    executor = inference_executor.stats()
+    return {
+        ("inference_in_flight",): executor["in_flight"],
+        ("inference_waiting",): executor["waiting"],
+        ("micro_batch",): intent_scheduler.depth(),
+        ("jobs_queued",): job_queue.store.count_queued(),
+    }
+
+metrics.register(metrics.CallbackMetric(
+    "ui_intent_cache_requests_total", "Cache lookups by cache and result.", "counter", ("cache", "result"), _cache_events,
+))
+metrics.register(metrics.CallbackMetric(
+    "ui_intent_queue_depth", "Current queue depth / in-flight work.", "gauge", ("queue",), _queue_depths,
+))
+metrics.register(metrics.CallbackMetric(
+    "ui_intent_heads_info", "Active intent-head weights (value is always 1).", "gauge", ("weights_hash", "model_version"),
+    lambda: {(intent_heads.weights_hash()[:16], model_version()): 1} if intent_heads.is_loaded() else {},
+))
+metrics.register(metrics.CallbackMetric(
+    "ui_intent_models_ready", "1 once models are loaded and warmed up.", "gauge", (),
+    lambda: {(): int(models_ready.is_set())},
+))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of stage latencies, counters and queue depths."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+# --- Admin endpoints (disabled unless ADMIN_TOKEN is set) ---
+
+def check_admin_token(http_request: Request):
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if http_request.headers.get("x-admin-token") != admin_token:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+profiler = SamplingProfiler()
+PROFILE_MAX_SECONDS = 120.0
+
+@app.post("/admin/profile", response_class=PlainTextResponse)
+async def run_profile(http_request: Request, seconds: float = 10.0, requests: int = 0,
+                      interval_ms: float = 5.0, include_idle: bool = False):
+    """
+    Samples every thread's stack on this worker for `seconds` (or until
+    `requests` more HTTP requests finish, whichever is first) and returns
+    collapsed stacks for flamegraph.pl / speedscope. Needs X-Admin-Token.
+    """
+    check_admin_token(http_request)
+
+    seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+    try:
+        profiler.start(max(interval_ms, 1.0) / 1000.0, include_idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    started = time.perf_counter()
+    # This request itself finishes after the profile, so it never counts toward `requests`
+    target = request_counter.value + requests if requests > 0 else None
+    try:
+        while time.perf_counter() - started < seconds:
+            if target is not None and request_counter.value >= target:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await asyncio.to_thread(profiler.stop)
+
+    elapsed = time.perf_counter() - started
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            "X-Profile-Samples": str(profiler.samples),
+            "X-Profile-Seconds": f"{elapsed:.2f}",
+            "X-Profile-Pid": str(os.getpid()),
+        },
+    )
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    # Fail fast under overload instead of letting latency grow without bound
+    metrics.REJECTIONS.inc(exc.status_code)
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"status": "error", "message": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.get("/health")
+@app.get("/health/live")
 def health_check():
+    """Liveness: the process is up and serving HTTP."""
     return {"status": "ok"}
 
-@app.post("/predict")
-def predict_intent(request: IntentRequest):
-    CATEGORY_LABELS = ["portfolio", "landing", "dashboard"]
-    COMPLEXITY_LABELS = ["simple", "standard", "rich"]
-    COMPONENT_LABELS = ["hero", "projectsGrid", "gallery", "contactForm", "features", "chart", "table", "kpiCards"]
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: models are loaded and warmed up, so traffic can be routed here."""
+    if not models_ready.is_set():
+        status = "error" if startup_error else "warming_up"
+        return JSONResponse(status_code=503, content={"status": status, "error": startup_error})
+    return {
+        "status": "ready",
+        "encoder_loaded": encoder.is_loaded(),
+        "encoder_backend": encoder.BACKEND_NAME,
+        "heads_weights_hash": intent_heads.weights_hash(),
+        "model_version": model_version(),
+    }
+
+CATEGORY_LABELS = ["portfolio", "landing", "dashboard"]
+COMPLEXITY_LABELS = ["simple", "standard", "rich"]
+COMPONENT_LABELS = ["hero", "projectsGrid", "gallery", "contactForm", "features", "chart", "table", "kpiCards"]
 
+def decode_intent(cat_probs: list, comp_probs: list, components_probs: list) -> dict:
+    """Turns per-prompt head probabilities into the /predict response payload."""
+    # Category processing
+    cat_top_k = [
+        {"label": CATEGORY_LABELS[i], "prob": round(p, 3)}
+        for i, p in enumerate(cat_probs)
+    ]
+    # Sort descending
+    cat_top_k.sort(key=lambda x: x["prob"], reverse=True)
+    best_cat = cat_top_k[0]
+
+    # Complexity processing
+    comp_top_k = [
+        {"label": COMPLEXITY_LABELS[i], "prob": round(p, 3)}
+        for i, p in enumerate(comp_probs)
+    ]
+    comp_top_k.sort(key=lambda x: x["prob"], reverse=True)
+    best_comp = comp_top_k[0]
+
+    # Components processing
+    predicted_components = []
+    for i, p in enumerate(components_probs):
+        if p > 0.5:
+            predicted_components.append({
+                "name": COMPONENT_LABELS[i],
+                "prob": round(p, 3)
+            })
+
+    return {
+        "category": {
+            "label": best_cat["label"],
+            "confidence": best_cat["prob"],
+            "top_k": cat_top_k
+        },
+        "complexity": {
+            "label": best_comp["label"],
+            "confidence": best_comp["prob"]
+        },
+        "components": predicted_components,
+        "section_budget": 6,
+        "needs_clarification": False
+    }
+
+def predict_batch(prompts: list[str], bucket_size: int | None = None) -> list[dict]:
+    """
+    Runs one batched encode and one fused head pass for a list of prompts.
+    With bucket_size, prompts are encoded in buckets of similar token length.
+    """
+    metrics.INTENT_BATCH_SIZE.observe(len(prompts))
     with torch.no_grad():
-        # 1. Encode text
-        embedding = encode_text(request.prompt).to(device)
-        
-        # 2. Forward pass
-        cat_logits, comp_logits, components_logits = model(embedding)
-        
-        # 3. Softmax / Sigmoid
-        cat_probs = torch.softmax(cat_logits, dim=1).squeeze(0).cpu().tolist()
-        comp_probs = torch.softmax(comp_logits, dim=1).squeeze(0).cpu().tolist()
-        components_probs = torch.sigmoid(components_logits).squeeze(0).cpu().tolist()
-
-        # Category processing
-        cat_top_k = [
-            {"label": CATEGORY_LABELS[i], "prob": round(p, 3)}
-            for i, p in enumerate(cat_probs)
-        ]
-        # Sort descending
-        cat_top_k.sort(key=lambda x: x["prob"], reverse=True)
-        best_cat = cat_top_k[0]
-
-        # Complexity processing
-        comp_top_k = [
-            {"label": COMPLEXITY_LABELS[i], "prob": round(p, 3)}
-            for i, p in enumerate(comp_probs)
-        ]
-        comp_top_k.sort(key=lambda x: x["prob"], reverse=True)
-        best_comp = comp_top_k[0]
-
-        # Components processing
-        predicted_components = []
-        for i, p in enumerate(components_probs):
-            if p > 0.5:
-                predicted_components.append({
-                    "name": COMPONENT_LABELS[i],
-                    "prob": round(p, 3)
-                })
+        # 1. Encode all prompts at once
+        with stage("encode"):
+            embeddings = encode_texts(prompts, bucket_size=bucket_size).to(device)
 
-        return {
-            "category": {
-                "label": best_cat["label"],
-                "confidence": best_cat["prob"],
-                "top_k": cat_top_k
-            },
-            "complexity": {
-                "label": best_comp["label"],
-                "confidence": best_comp["prob"]
-            },
-            "components": predicted_components,
-            "section_budget": 6,
-            "needs_clarification": False
-        }
+        # 2. Fused forward pass + softmax/softmax/sigmoid -> (batch, 14), one host copy
+        with stage("intent_heads"):
+            probs = get_fused_heads().predict_proba(embeddings).tolist()
+
+    return [
+        decode_intent(row[CATEGORY_SLICE], row[COMPLEXITY_SLICE], row[COMPONENTS_SLICE])
+        for row in probs
+    ]
+
+def predict_batch_timed(prompts: list[str]) -> list[tuple]:
+    """Scheduler batch fn: every caller gets (prediction, stage timings of the shared batch)."""
+    with metrics.collect_timings() as timings:
+        rows = predict_batch(prompts)
+    return [(row, timings) for row in rows]
+
+# Concurrent /predict and /plan calls are grouped into micro-batches
+intent_scheduler = MicroBatchScheduler(
+    predict_batch_timed,
+    max_batch_size=int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16")),
+    max_wait_ms=float(os.getenv("INFERENCE_MAX_WAIT_MS", "5")),
+)
+
+# Admission control + dedicated threads for inference (instead of Starlette's shared pool)
+inference_executor = InferenceExecutor(
+    max_concurrency=int(os.getenv("INFERENCE_CONCURRENCY", "16")),
+    max_queue=int(os.getenv("INFERENCE_QUEUE_SIZE", "64")),
+    queue_timeout_ms=float(os.getenv("INFERENCE_QUEUE_TIMEOUT_MS", "1000")),
+    compute_workers=int(os.getenv("INFERENCE_COMPUTE_WORKERS", "1")),
+)
+# The micro-batch scheduler thread is the other torch compute thread
+inference_executor.configure_torch_threads(other_compute_threads=1)
+
+WARMUP_PROMPTS = [
+    "minimal portfolio website with projects and contact form",
+    "saas landing page with features and pricing",
+    "admin dashboard with charts, kpi cards and a table",
+    "task manager app for internal teams",
+]
+
+def load_and_warm_up():
+    """Loads the encoder and heads, then runs synthetic prompts through every inference path."""
+    global startup_error
+    try:
+        start = time.perf_counter()
+        encoder.warmup()
+        get_intent_model()
+        get_fused_heads()
+        if get_cascade() is not None:
+            get_cascade().predict_proba(WARMUP_PROMPTS)
+
+        # Scheduler -> batched encode -> heads -> planner, as a real /plan would
+        futures = [intent_scheduler.submit(p) for p in WARMUP_PROMPTS]
+        for prompt, future in zip(WARMUP_PROMPTS, futures):
+            generate_ui_plan(future.result()[0], prompt=prompt, seed=0)
+
+        models_ready.set()
+        print(f"Models loaded and warmed up in {time.perf_counter() - start:.2f}s.")
+    except Exception as e:
+        startup_error = str(e)
+        print(f"Model warmup failed: {e}")
+
+# --- Cheap-first cascade: the n-gram model answers confident prompts without MiniLM ---
+
+# Fraction of cascade answers re-run through the full model to measure agreement
+CASCADE_SHADOW_RATE = float(os.getenv("CASCADE_SHADOW_RATE", "0.05"))
+
+def cascade_predict(prompts: list[str]) -> list:
+    """Cascade predictions for the prompts it is confident about, None where MiniLM has to decide."""
+    cascade = get_cascade()
+    if cascade is None:
+        return [None] * len(prompts)
+    with stage("cascade"):
+        probs, confidences = cascade.predict_proba(prompts)
+    results = [
+        decode_intent(row[CATEGORY_SLICE], row[COMPLEXITY_SLICE], row[COMPONENTS_SLICE])
+        if confidence >= CASCADE_MIN_CONFIDENCE else None
+        for row, confidence in zip(probs.tolist(), confidences)
+    ]
+    answered = sum(r is not None for r in results)
+    if answered:
+        metrics.CASCADE_REQUESTS.inc("answered", amount=answered)
+    if answered < len(results):
+        metrics.CASCADE_REQUESTS.inc("fallback", amount=len(results) - answered)
+    return results
+
+def _record_agreement(cascade_prediction: dict, future):
+    if future.exception() is not None:
+        return
+    full, _ = future.result()
+    for head, agree in (
+        ("category", cascade_prediction["category"]["label"] == full["category"]["label"]),
+        ("complexity", cascade_prediction["complexity"]["label"] == full["complexity"]["label"]),
+        ("components", {c["name"] for c in cascade_prediction["components"]} == {c["name"] for c in full["components"]}),
+    ):
+        metrics.CASCADE_AGREEMENT.inc(head, "agree" if agree else "disagree")
+
+def shadow_check(prompt: str, cascade_prediction: dict):
+    """Sends a sample of cascade answers through the full model too, only while inference has spare capacity."""
+    if random.random() >= CASCADE_SHADOW_RATE:
+        return
+    executor = inference_executor.stats()
+    if executor["waiting"] or executor["in_flight"] >= executor["max_concurrency"] or intent_scheduler.depth():
+        return
+    intent_scheduler.submit(prompt).add_done_callback(functools.partial(_record_agreement, cascade_prediction))
+
+def predict_batch_cascaded(prompts: list[str], bucket_size: int | None = None) -> list[dict]:
+    """predict_batch with the cascade in front: only prompts it is unsure about are encoded."""
+    results = cascade_predict(prompts)
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        for i, prediction in zip(pending, predict_batch([prompts[i] for i in pending], bucket_size)):
+            results[i] = prediction
+    return results
+
+def cascade_stats() -> dict:
+    cascade = get_cascade()
+    answered = metrics.CASCADE_REQUESTS.get("answered")
+    total = answered + metrics.CASCADE_REQUESTS.get("fallback")
+    agreement = {}
+    for head in ("category", "complexity", "components"):
+        agree = metrics.CASCADE_AGREEMENT.get(head, "agree")
+        checked = agree + metrics.CASCADE_AGREEMENT.get(head, "disagree")
+        agreement[head] = round(agree / checked, 3) if checked else None
+    return {
+        "enabled": cascade is not None,
+        "cascade_id": cascade.cascade_id if cascade is not None else None,
+        "min_confidence": CASCADE_MIN_CONFIDENCE,
+        "answered": answered,
+        "fallback": total - answered,
+        "cascade_rate": round(answered / total, 3) if total else None,
+        "shadow_agreement": agreement,
+    }
+
+@app.post("/predict")
+async def predict_intent(request: IntentRequest):
+    # Confident cascade answers skip admission, micro-batching and the encoder entirely
+    prediction = cascade_predict([request.prompt])[0]
+    if prediction is not None:
+        shadow_check(request.prompt, prediction)
+        return prediction
+
+    # Includes admission + micro-batch queueing; "encode"/"intent_heads" are the compute part
+    with stage("intent_request"):
+        prediction, batch_timings = await inference_executor.run_scheduled(intent_scheduler.submit, request.prompt)
+    metrics.add_request_timings(batch_timings)
+    return prediction
+
+def build_plan(prediction_output: dict, prompt: str, seed: int | None = None) -> dict:
+    """Turns one intent prediction into the final /plan payload."""
+    # Scan the prompt once for both the planner rules and the keyword overrides
+    with stage("plan_keywords"):
+        matched_keywords = match_prompt_keywords(prompt)
+    with stage("plan_generate"):
+        ui_plan = generate_ui_plan(prediction_output, prompt=prompt, seed=seed, matched_keywords=matched_keywords)
+    with stage("plan_overrides"):
+        return apply_keyword_overrides(ui_plan, matched_keywords)
+
+def prediction_version() -> str:
+    """model_version() plus the cascade and its threshold, since either can change a prediction."""
+    cascade = get_cascade()
+    if cascade is None:
+        return model_version()
+    ident = f"{model_version()}|{cascade.cascade_id}|{CASCADE_MIN_CONFIDENCE}"
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()[:16]
+
+# Seeded /plan responses, keyed (and ETagged) by prompt, seed, model and planner version
+plan_cache = PlanCache(max_size=int(os.getenv("PLAN_CACHE_SIZE", "2048")))
+
+# Swaps in new head weights (file polling or /admin/reload-heads); cached plans carry the old version
+heads_reloader = HeadsReloader(on_swap=plan_cache.invalidate)
+
+@app.post("/admin/reload-heads")
+async def reload_heads(http_request: Request, force: bool = False):
+    """
+    Loads, smoke-tests and swaps in the intent-head weights file on this worker
+    without reloading the encoder. Needs X-Admin-Token.
+    """
+    check_admin_token(http_request)
+    try:
+        return await asyncio.to_thread(heads_reloader.reload, force)
+    except HeadsValidationError as e:
+        raise HTTPException(status_code=422, detail={"error": e.reason, "smoke": e.report})
+    except Exception as e:
+        raise HTTPException(status_code=422, detail={"error": f"Could not load weights: {e}"})
 
 @app.post("/plan")
-def create_plan(request: PlanRequest):
-    # Internally call existing prediction logic directly
-    prediction_output = predict_intent(IntentRequest(prompt=request.prompt))
-    
-    # Pass prediction output into generate_ui_plan
-    ui_plan = generate_ui_plan(prediction_output, prompt=request.prompt, seed=request.seed)
-    
-    # Fast keyword intercepts to bypass PyTorch frozen weights for new modules (Ensure 1-to-1 max overrides!)
-    prompt_lower = request.prompt.lower()
-    injected_overrides = set()
-    
-    for sec in ui_plan.get("sections", []):
-        if "fullscreen" in prompt_lower and sec["type"] == "hero" and "fullscreenHero" not in injected_overrides:
-            sec["type"] = "fullscreenHero"
-            injected_overrides.add("fullscreenHero")
-        elif "bento" in prompt_lower and sec["type"] in ["features", "featuresRow"] and "bentoGrid" not in injected_overrides:
-            sec["type"] = "bentoGrid"
-            injected_overrides.add("bentoGrid")
-        elif "marquee" in prompt_lower and sec["type"] in ["projectsGrid", "contactForm", "ctaBand"] and "marqueeBand" not in injected_overrides:
-            sec["type"] = "marqueeBand"
-            injected_overrides.add("marqueeBand")
-        elif "split" in prompt_lower and sec["type"] in ["projectsGrid", "featuresRow", "features"] and "splitReveal" not in injected_overrides:
-            sec["type"] = "splitReveal"
-            injected_overrides.add("splitReveal")
-        elif "gallery" in prompt_lower and sec["type"] in ["projectsGrid", "featuresRow", "features"] and "horizontalGallery" not in injected_overrides:
-            sec["type"] = "horizontalGallery"
-            injected_overrides.add("horizontalGallery")
-            
-    # Final deduplication loop as a failsafe
-    seen = set()
-    deduped_sections = []
-    for s in ui_plan.get("sections", []):
-        if s["type"] not in seen:
-            seen.add(s["type"])
-            deduped_sections.append(s)
-    ui_plan["sections"] = deduped_sections
-            
-    return ui_plan
+async def create_plan(request: PlanRequest, http_request: Request):
+    # Without a seed the plan is random, so it is neither cached nor ETagged
+    if request.seed is None:
+        prediction_output = await predict_intent(IntentRequest(prompt=request.prompt))
+        return build_plan(prediction_output, prompt=request.prompt)
+
+    version = prediction_version()
+    etag = PlanCache.etag_for(request.prompt, request.seed, version, PLANNER_VERSION)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    # Conditional request: the ETag alone proves the client's copy is current
+    if PlanCache.matches(http_request.headers.get("if-none-match"), etag):
+        plan_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+
+    body = plan_cache.get(etag)
+    if body is None:
+        # Internally call existing prediction logic directly
+        prediction_output = await predict_intent(IntentRequest(prompt=request.prompt))
+        ui_plan = build_plan(prediction_output, prompt=request.prompt, seed=request.seed)
+        body = json.dumps(ui_plan, separators=(",", ":")).encode("utf-8")
+        # Heads swapped mid-request: the body may come from either version, so don't cache it under this ETag
+        if prediction_version() == version:
+            plan_cache.put(etag, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _check_batch_size(prompts: list):
+    if len(prompts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} prompts per batch request.")
+
+@app.post("/predict/batch")
+async def predict_intent_batch(request: PredictBatchRequest):
+    """Predicts intent for many prompts in one call (length-bucketed encoding)."""
+    _check_batch_size(request.prompts)
+    if not request.prompts:
+        return {"results": []}
+    return {"results": await inference_executor.run(predict_batch_cascaded, request.prompts, ENCODE_BUCKET_SIZE)}
+
+def _plan_batch(request: PlanBatchRequest) -> dict:
+    seeds = request.seeds if request.seeds is not None else [None] * len(request.prompts)
+    predictions = predict_batch_cascaded(request.prompts, bucket_size=ENCODE_BUCKET_SIZE)
+    return {
+        "results": [
+            build_plan(prediction, prompt=prompt, seed=seed)
+            for prediction, prompt, seed in zip(predictions, request.prompts, seeds)
+        ]
+    }
+
+@app.post("/plan/batch")
+async def create_plan_batch(request: PlanBatchRequest):
+    """Generates plans for many prompts in one call, with optional per-item seeds."""
+    _check_batch_size(request.prompts)
+    if request.seeds is not None and len(request.seeds) != len(request.prompts):
+        raise HTTPException(status_code=422, detail="'seeds' must have the same length as 'prompts'.")
+    if not request.prompts:
+        return {"results": []}
+    return await inference_executor.run(_plan_batch, request)
+
+# Reuses copy for reworded prompts with the same layout mode and sections
+copy_cache = SemanticCopyCache(
+    threshold=float(os.getenv("COPY_CACHE_THRESHOLD", "0.92")),
+    ttl_seconds=float(os.getenv("COPY_CACHE_TTL_SECONDS", "3600")),
+    max_entries_per_key=int(os.getenv("COPY_CACHE_MAX_PER_KEY", "256")),
+    max_keys=int(os.getenv("COPY_CACHE_MAX_KEYS", "512")),
+)
 
 @app.post("/generate-copy")
 async def generate_copy(request: GenerateCopyRequest):
     try:
+        cache_key = SemanticCopyCache.key(request.layout_mode, request.sections)
+        embedding = None
+        try:
+            embedding = (await inference_executor.run(encode_text, request.prompt))[0].cpu().numpy()
+        except Overloaded:
+            # Skip the cache rather than reject; the LLM call does not need the encoder
+            pass
+
+        if embedding is not None:
+            cached = copy_cache.lookup(cache_key, embedding)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
         content = await asyncio.wait_for(
             generate_marketing_copy(
                 prompt=request.prompt,
@@ -167,13 +580,83 @@ async def generate_copy(request: GenerateCopyRequest):
             ),
             timeout=8.0
         )
+        # Empty dicts are failures (missing key, API error); never cache those
+        if content and embedding is not None:
+            copy_cache.insert(cache_key, embedding, content, time.perf_counter() - start)
         return content
     except asyncio.TimeoutError:
+        metrics.TIMEOUTS.inc("generate_copy")
         return {}
     except Exception as e:
         print(f"Generate copy failed: {e}")
         return {}
 
+COPY_STREAM_TIMEOUT_SECONDS = float(os.getenv("COPY_STREAM_TIMEOUT_SECONDS", "8.0"))
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/generate-copy/stream")
+async def generate_copy_stream(request: GenerateCopyRequest):
+    """
+    Server-Sent Events variant of /generate-copy.
+
+    Emits one "section" event per completed top-level section as the LLM
+    streams its JSON, then a final "done" event. complete=true only when the
+    whole JSON object arrived; the deadline, an LLM error or a truncated
+    stream end it with complete=false but keep every section already sent.
+    """
+    cache_key = SemanticCopyCache.key(request.layout_mode, request.sections)
+    embedding = None
+    try:
+        embedding = (await inference_executor.run(encode_text, request.prompt))[0].cpu().numpy()
+    except Overloaded:
+        pass
+    cached = copy_cache.lookup(cache_key, embedding) if embedding is not None else None
+
+    async def events():
+        if cached is not None:
+            for name, copy in cached.items():
+                yield sse_event("section", {"section": name, "copy": copy})
+            yield sse_event("done", {"complete": True, "cached": True, "sections": list(cached)})
+            return
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + COPY_STREAM_TIMEOUT_SECONDS
+        sections = {}
+        complete = False
+        stream = stream_marketing_copy(request.prompt, request.layout_mode, request.sections)
+        try:
+            while True:
+                try:
+                    name, copy = await asyncio.wait_for(stream.__anext__(), timeout=max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    # Only reached once the parser saw the top-level object close
+                    complete = True
+                    break
+                except asyncio.TimeoutError:
+                    metrics.TIMEOUTS.inc("generate_copy_stream")
+                    break
+                except CopyStreamIncomplete as e:
+                    print(f"Copy stream incomplete: {e}")
+                    break
+                sections[name] = copy
+                yield sse_event("section", {"section": name, "copy": copy})
+        finally:
+            await stream.aclose()
+
+        # Only a fully streamed response is worth reusing for similar prompts
+        if complete and sections and embedding is not None:
+            copy_cache.insert(cache_key, embedding, sections, time.perf_counter() - start)
+        yield sse_event("done", {"complete": complete, "cached": False, "sections": list(sections)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 class ParseResumeRequest(BaseModel):
     resume_text: str
 
@@ -188,43 +671,192 @@ async def parse_resume(request: ParseResumeRequest):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+async def process_resume_pdf(path: str, pdf_sha256: str, report=None) -> dict:
+    """
+    Shared PDF -> text -> portfolio pipeline for /upload and upload jobs.
+    `report(progress, stage)` is awaited between stages when given.
+    """
+    async def progress(value: float, stage: str):
+        if report is not None:
+            await report(value, stage)
+
+    # Extract text from PDF server-side (skipped for bytes seen before at these limits)
+    await progress(0.1, "extracting")
+    text_key = f"{pdf_sha256}:{RESUME_TEXT_MAX_CHARS}:{PDF_MAX_PAGES}"
+    cached_text = await asyncio.to_thread(resume_cache.get_text, text_key)
+    if cached_text is not None:
+        raw_text, extraction = cached_text
+    else:
+        with stage("pdf_extract"):
+            raw_text, extraction = await extract_resume_text(path)
+        await asyncio.to_thread(resume_cache.put_text, text_key, raw_text, extraction)
+    if not raw_text or len(raw_text.strip()) < 50:
+        return {
+            "status": "error",
+            "message": "Could not extract enough text from this PDF. It may be a scanned image."
+        }
+
+    # Transform via LLM
+    await progress(0.4, "transforming")
+    portfolio_json = await parse_resume_to_portfolio(raw_text)
+    if "error" in portfolio_json:
+        return {"status": "error", "message": portfolio_json["error"]}
+
+    return {
+        "status": "success",
+        "data": portfolio_json,
+        "chars_extracted": extraction["raw_chars"],
+        # Pages past PDF_MAX_PAGES or text past the character budget were not parsed
+        "pages_total": extraction["pages_total"],
+        "pages_extracted": extraction["pages_extracted"],
+        "truncated": extraction["truncated"],
+    }
+
 @app.post("/upload")
 async def upload_resume(file: UploadFile = File(...)):
     """
     Accept a PDF resume file via multipart upload.
-    Extracts text server-side using pdfplumber, then transforms via LLM.
+    Spools it to disk, extracts text page-parallel in a process pool
+    (off the event loop), then transforms via LLM.
     """
+    path = None
     try:
         # Validate file type
         if not file.filename.lower().endswith('.pdf'):
             return {"status": "error", "message": "Only PDF files are supported."}
 
-        # Read file bytes
-        file_bytes = await file.read()
-        if len(file_bytes) == 0:
-            return {"status": "error", "message": "Empty file uploaded."}
-
-        # Extract text from PDF server-side
-        raw_text = extract_text_from_pdf(file_bytes)
-        if not raw_text or len(raw_text.strip()) < 50:
-            return {
-                "status": "error",
-                "message": "Could not extract enough text from this PDF. It may be a scanned image."
-            }
-
-        # Transform via LLM
-        portfolio_json = await parse_resume_to_portfolio(raw_text)
-        if "error" in portfolio_json:
-            return {"status": "error", "message": portfolio_json["error"]}
+        # Spool to disk with a size cap instead of reading into memory
+        try:
+            path, pdf_sha256 = await pdf_extract.spool_upload(file)
+        except pdf_extract.UploadRejected as e:
+            return {"status": "error", "message": str(e)}
 
-        return {
-            "status": "success",
-            "data": portfolio_json,
-            "chars_extracted": len(raw_text),
-        }
+        return await process_resume_pdf(path, pdf_sha256)
     except Exception as e:
         print(f"Upload processing failed: {e}")
         return {"status": "error", "message": str(e)}
+    finally:
+        if path is not None:
+            os.unlink(path)
+
+# --- Background jobs: submit returns immediately, clients poll / long-poll / stream ---
+
+def _discard_file(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+async def run_upload_job(payload: dict, report) -> dict:
+    path = payload["path"]
+    try:
+        result = await process_resume_pdf(path, payload["sha256"], report)
+    except asyncio.CancelledError:
+        # Keep the spooled file; the job is requeued on the next start
+        raise
+    except Exception:
+        _discard_file(path)
+        raise
+    _discard_file(path)
+    if result["status"] == "error":
+        raise RuntimeError(result["message"])
+    return result
+
+async def run_parse_resume_job(payload: dict, report) -> dict:
+    await report(0.2, "transforming")
+    portfolio_json = await parse_resume_to_portfolio(payload["resume_text"])
+    if "error" in portfolio_json:
+        raise RuntimeError(portfolio_json["error"])
+    return {"status": "success", "data": portfolio_json}
+
+job_queue = JobQueue(
+    JobStore(),
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_queued=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+)
+job_queue.register("upload", run_upload_job, discard=lambda payload: _discard_file(payload["path"]))
+job_queue.register("parse_resume", run_parse_resume_job)
+
+JOB_LONG_POLL_MAX_SECONDS = 30.0
+
+def public_job(job: dict) -> dict:
+    # Payloads hold server-side paths and raw resume text; never echo them back
+    return {k: v for k, v in job.items() if k != "payload"}
+
+def job_accepted(job: dict) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["job_id"], "status": job["status"], "status_url": f"/jobs/{job['job_id']}"},
+    )
+
+# Mounted at both / and /api (clients already call /api/analyze and /api/jobs)
+jobs_router = APIRouter()
+
+@jobs_router.post("/jobs/upload")
+@jobs_router.post("/analyze")
+async def submit_upload_job(file: UploadFile = File(...)):
+    """Queue a PDF resume for parsing; returns 202 with a job id immediately."""
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=415, detail="Only PDF files are supported.")
+    try:
+        path, pdf_sha256 = await pdf_extract.spool_upload(file, directory=JOB_SPOOL_DIR)
+    except pdf_extract.UploadRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job = await job_queue.submit("upload", {"path": path, "sha256": pdf_sha256, "filename": file.filename})
+    except BaseException:
+        _discard_file(path)
+        raise
+    return job_accepted(job)
+
+@jobs_router.post("/jobs")
+async def submit_parse_resume_job(request: ParseResumeRequest):
+    """Queue raw resume text for transformation; returns 202 with a job id immediately."""
+    job = await job_queue.submit("parse_resume", {"resume_text": request.resume_text})
+    return job_accepted(job)
+
+@jobs_router.get("/jobs")
+async def list_jobs(status: str | None = None, limit: int = 50):
+    jobs = await asyncio.to_thread(job_queue.store.list, min(max(limit, 1), 500), status)
+    return {"jobs": [public_job(job) for job in jobs]}
+
+@jobs_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0, since: float = 0.0):
+    """
+    Job status and progress. With `wait` > 0 this long-polls: it returns as soon
+    as the job changes after `since` (its last seen updated_at) or finishes.
+    """
+    if wait > 0:
+        job = await job_queue.wait_for_update(job_id, since, min(wait, JOB_LONG_POLL_MAX_SECONDS))
+    else:
+        job = await asyncio.to_thread(job_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_job(job)
+
+@jobs_router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: a "progress" event per change, then "done" with the final job."""
+    job = await asyncio.to_thread(job_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        current = job
+        while current is not None and current["status"] not in TERMINAL_STATUSES:
+            yield sse_event("progress", public_job(current))
+            current = await job_queue.wait_for_update(job_id, current["updated_at"], JOB_LONG_POLL_MAX_SECONDS)
+        if current is not None:
+            yield sse_event("done", public_job(current))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+app.include_router(jobs_router)
+app.include_router(jobs_router, prefix="/api")
 
 if __name__ == "__main__":
     import uvicorn
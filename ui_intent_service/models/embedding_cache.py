@@ -0,0 +1,157 @@
+import os
+import fcntl
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Canonical cache key for a prompt.
+    MiniLM's tokenizer is uncased and whitespace-insensitive, so lowercasing and
+    collapsing whitespace never changes the resulting embedding.
+    """
+    return " ".join(str(text).lower().split())
+
+
+class LRUEmbeddingCache:
+    """
+    Thread-safe in-process LRU cache of prompt embeddings with hit/miss counters.
+    Values are (dim,) CPU float tensors keyed by the normalized prompt.
+    """
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, torch.Tensor] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> torch.Tensor | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: torch.Tensor):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class PersistentEmbeddingStore:
+    """
+    Append-only on-disk embedding tier shared across restarts (and workers).
+
+    Layout inside `directory`:
+      - embeddings.f32: memory-mapped float32 array of shape (capacity, dim)
+      - keys.txt: one normalized prompt per line; line N owns row N
+
+    A vector is written and flushed before its key is appended, so a crash can
+    never index a half-written row. Appends are serialized with flock, which also
+    lets several worker processes share one store.
+    """
+    def __init__(self, directory: str, dim: int = 384, capacity: int = 100_000):
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors_path = os.path.join(directory, "embeddings.f32")
+        self._keys_path = os.path.join(directory, "keys.txt")
+        self._index: dict[str, int] = {}
+        self._rows = 0
+        self._keys_offset = 0
+        self._lock = threading.Lock()
+
+        # Sparse file: untouched rows cost no disk space
+        if not os.path.exists(self._vectors_path):
+            with open(self._vectors_path, "wb") as f:
+                f.truncate(capacity * dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        open(self._keys_path, "a").close()
+
+        with self._lock:
+            self._sync_index()
+
+    def _sync_index(self):
+        """Picks up keys appended since the last sync (by us or another process)."""
+        with open(self._keys_path, "r", encoding="utf-8") as f:
+            f.seek(self._keys_offset)
+            while True:
+                line = f.readline()
+                # A line without its newline is still being written
+                if not line.endswith("\n"):
+                    break
+                self._keys_offset += len(line.encode("utf-8"))
+                self._index.setdefault(line[:-1], self._rows)
+                self._rows += 1
+
+    def get(self, key: str) -> torch.Tensor | None:
+        with self._lock:
+            row = self._index.get(key)
+            if row is None:
+                self._sync_index()
+                row = self._index.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return torch.from_numpy(np.array(self._vectors[row]))
+
+    def put(self, key: str, value: torch.Tensor):
+        vector = value.detach().to("cpu", torch.float32).numpy().reshape(-1)
+        if vector.shape[0] != self.dim:
+            return
+        with self._lock, open(self._keys_path, "a", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._sync_index()
+                if key in self._index or self._rows >= self.capacity:
+                    return
+                row = self._rows
+                self._vectors[row] = vector
+                self._vectors.flush()
+                f.write(key + "\n")
+                f.flush()
+                self._index[key] = row
+                self._rows += 1
+                self._keys_offset += len((key + "\n").encode("utf-8"))
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "rows": self._rows,
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
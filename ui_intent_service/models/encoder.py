@@ -1,25 +1,166 @@
+import os
+import threading
 import torch
-from sentence_transformers import SentenceTransformer
 
-# Load sentence-transformers/all-MiniLM-L6-v2
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+from models.embedding_cache import LRUEmbeddingCache, PersistentEmbeddingStore, normalize_prompt
+from models.encoder_backends import create_backend
 
-# Set model to eval mode
-model.eval()
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
 
-# Freeze all parameters
-for param in model.parameters():
-    param.requires_grad = False
+# fp32 (default), int8 (dynamic quantization) or onnx (ONNX Runtime)
+BACKEND_NAME = os.getenv("ENCODER_BACKEND", "fp32")
+
+# Identifies which vectors this encoder produces; used to key persisted embeddings
+ENCODER_ID = f"{MODEL_NAME}:{BACKEND_NAME}"
+
+# Loaded lazily by get_backend(): importing this module must stay cheap
+model = None
+backend = None
+_load_lock = threading.Lock()
+
+def get_backend():
+    """
+    Returns the encoder backend, loading MiniLM on first use.
+    Weights come from safetensors, which are memory-mapped rather than read into
+    private memory.
+    """
+    global model, backend
+    if backend is None:
+        with _load_lock:
+            if backend is None:
+                # sentence_transformers alone takes seconds to import, so it is deferred too
+                from sentence_transformers import SentenceTransformer
+
+                # Load sentence-transformers/all-MiniLM-L6-v2
+                st_model = SentenceTransformer(MODEL_NAME)
+
+                # Set model to eval mode
+                st_model.eval()
+
+                # Freeze all parameters
+                for param in st_model.parameters():
+                    param.requires_grad = False
+
+                model = st_model
+                backend = create_backend(BACKEND_NAME, st_model, onnx_path=os.getenv("ENCODER_ONNX_PATH"))
+    return backend
+
+def is_loaded() -> bool:
+    return backend is not None
+
+def warmup(batch_sizes: tuple = (1, 4, 16)):
+    """
+    Runs synthetic prompts through the backend at a few batch sizes so lazy
+    kernels, allocator pools and ONNX/quantized graphs are initialized before
+    real traffic. Bypasses the caches so the encoder actually runs.
+    """
+    encoder_backend = get_backend()
+    prompts = [f"warmup prompt {i}: minimal portfolio landing page with dashboard charts" for i in range(max(batch_sizes))]
+    with torch.no_grad():
+        for size in batch_sizes:
+            encoder_backend.encode(prompts[:size])
+
+# Output width of all-MiniLM-L6-v2 (the (1, 384) contract UIIntentModel expects)
+EMBEDDING_DIM = 384
+
+# Tier 1: in-process LRU (EMBEDDING_CACHE_SIZE=0 disables it)
+memory_cache = LRUEmbeddingCache(max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")))
+
+# Tier 2: optional memory-mapped store so restarted workers start warm
+disk_cache = None
+if os.getenv("EMBEDDING_CACHE_DIR"):
+    disk_cache = PersistentEmbeddingStore(
+        os.path.join(os.getenv("EMBEDDING_CACHE_DIR"), ENCODER_ID.replace("/", "__").replace(":", "-")),
+        dim=EMBEDDING_DIM,
+        capacity=int(os.getenv("EMBEDDING_CACHE_DISK_ROWS", "100000")),
+    )
+
+def _lookup(key: str) -> torch.Tensor | None:
+    embedding = memory_cache.get(key)
+    if embedding is None and disk_cache is not None:
+        embedding = disk_cache.get(key)
+        if embedding is not None:
+            memory_cache.put(key, embedding)
+    return embedding
+
+def _store(key: str, embedding: torch.Tensor):
+    embedding = embedding.detach().cpu()
+    memory_cache.put(key, embedding)
+    if disk_cache is not None:
+        disk_cache.put(key, embedding)
+
+def cache_stats() -> dict:
+    """Hit/miss counters for both cache tiers."""
+    return {
+        "memory": memory_cache.stats(),
+        "disk": disk_cache.stats() if disk_cache is not None else None,
+    }
 
 def encode_text(text: str) -> torch.Tensor:
     """
     Takes a string and returns a torch tensor of shape (1, 384).
     """
-    # Use model.encode with convert_to_tensor=True
-    tensor_out = model.encode(text, convert_to_tensor=True)
-    
-    # Ensure consistent batch shape (1, 384) if output is (384,)
-    if len(tensor_out.shape) == 1:
-        tensor_out = tensor_out.unsqueeze(0)
-        
+    key = normalize_prompt(text)
+    cached = _lookup(key)
+    if cached is not None:
+        return cached.unsqueeze(0).to(get_backend().device)
+
+    # Backends always return a (batch, 384) tensor
+    tensor_out = get_backend().encode([text])
+
+    _store(key, tensor_out[0])
     return tensor_out
+
+def _encode_bucketed(texts: list[str], bucket_size: int) -> torch.Tensor:
+    """
+    Encodes texts sorted by token length in buckets of bucket_size, so each
+    forward pass pads only to the longest prompt in its own bucket.
+    Returns CPU embeddings in the original order.
+    """
+    encoder_backend = get_backend()
+    lengths = [len(ids) for ids in encoder_backend.tokenizer(texts, truncation=True)["input_ids"]]
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+    out = torch.empty((len(texts), EMBEDDING_DIM), dtype=torch.float32)
+    for start in range(0, len(order), bucket_size):
+        bucket = order[start:start + bucket_size]
+        out[bucket] = encoder_backend.encode([texts[i] for i in bucket]).detach().cpu()
+    return out
+
+def encode_texts(texts: list[str], bucket_size: int | None = None) -> torch.Tensor:
+    """
+    Takes a list of strings and returns a torch tensor of shape (len(texts), 384).
+    Cache misses are encoded together in a single batched forward pass, or in
+    token-length buckets of bucket_size when given (large offline batches).
+    """
+    if not texts:
+        return torch.empty((0, EMBEDDING_DIM))
+
+    keys = [normalize_prompt(t) for t in texts]
+    rows: list[torch.Tensor | None] = [_lookup(k) for k in keys]
+
+    # Encode each distinct missing prompt once
+    missing = list(dict.fromkeys(k for k, row in zip(keys, rows) if row is None))
+    if missing:
+        if bucket_size and len(missing) > bucket_size:
+            fresh = _encode_bucketed(missing, bucket_size)
+        else:
+            fresh = get_backend().encode(missing).detach().cpu()
+        fresh_by_key = {}
+        for key, embedding in zip(missing, fresh):
+            _store(key, embedding)
+            fresh_by_key[key] = embedding
+        rows = [row if row is not None else fresh_by_key[k] for k, row in zip(keys, rows)]
+
+    return torch.stack(rows).to(get_backend().device)
+
+def encode_corpus(texts: list[str], batch_size: int = 256):
+    """
+    Bulk-encodes a corpus in chunks, yielding (start_row, float32 array of shape
+    (chunk_len, 384)) pairs so callers can stream results into a memmap.
+    Bypasses the prompt caches, which are sized for online traffic.
+    """
+    encoder_backend = get_backend()
+    for start in range(0, len(texts), batch_size):
+        chunk = encoder_backend.encode(texts[start:start + batch_size], batch_size=batch_size)
+        yield start, chunk.detach().cpu().numpy().astype("float32", copy=False)
@@ -0,0 +1,161 @@
+import os
+from typing import TYPE_CHECKING
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Backends selectable through ENCODER_BACKEND
+BACKENDS = ("fp32", "int8", "onnx")
+
+
+class TorchFP32Backend:
+    """
+    Reference backend: the SentenceTransformer pipeline in fp32 on whatever
+    device torch picks (Transformer -> mean pooling -> L2 normalize).
+    """
+    name = "fp32"
+
+    def __init__(self, st_model: "SentenceTransformer"):
+        self.model = st_model
+
+    @property
+    def device(self) -> torch.device:
+        return self.model.device
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    def encode(self, texts: list[str], batch_size: int | None = None) -> torch.Tensor:
+        """Returns a (len(texts), 384) float32 tensor."""
+        return self.model.encode(list(texts), batch_size=batch_size or max(len(texts), 1), convert_to_tensor=True)
+
+
+class TorchInt8Backend(TorchFP32Backend):
+    """
+    Same pipeline with every nn.Linear dynamically quantized to int8 (CPU only).
+    Weights are quantized once at load; activations are quantized per call.
+    """
+    name = "int8"
+
+    def __init__(self, st_model: "SentenceTransformer"):
+        st_model = st_model.to("cpu")
+        torch.ao.quantization.quantize_dynamic(st_model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+        super().__init__(st_model)
+
+
+class _LastHiddenState(nn.Module):
+    """Keyword-only wrapper so the HF model traces with a stable ONNX signature."""
+    def __init__(self, auto_model: nn.Module):
+        super().__init__()
+        self.auto_model = auto_model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.auto_model(
+            input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+        ).last_hidden_state
+
+
+def export_onnx(st_model: "SentenceTransformer", onnx_path: str):
+    """Exports the transformer body (everything before pooling) to an ONNX graph."""
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    wrapper = _LastHiddenState(st_model[0].auto_model).to("cpu").eval()
+    features = st_model.tokenizer(["export sample", "a"], padding=True, return_tensors="pt")
+
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    tmp_path = onnx_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            tuple(features[n] for n in names),
+            tmp_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={n: {0: "batch", 1: "seq"} for n in names + ["last_hidden_state"]},
+            opset_version=17,
+            dynamo=False,
+        )
+    os.replace(tmp_path, onnx_path)
+
+
+class OnnxRuntimeBackend:
+    """
+    Transformer body on ONNX Runtime (CPU), with mean pooling and L2
+    normalization done in NumPy to reproduce the SentenceTransformer output.
+    The graph is exported from the loaded model on first use.
+    """
+    name = "onnx"
+    device = torch.device("cpu")
+
+    def __init__(self, st_model: "SentenceTransformer", onnx_path: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("ENCODER_BACKEND=onnx requires the 'onnxruntime' and 'onnx' packages.") from e
+
+        if not os.path.exists(onnx_path):
+            print(f"Exporting encoder to ONNX at {onnx_path}...")
+            export_onnx(st_model, onnx_path)
+
+        self.tokenizer = st_model.tokenizer
+        self.max_seq_length = st_model.max_seq_length
+        self.normalize = any(type(module).__name__ == "Normalize" for module in st_model)
+        self.onnx_path = onnx_path
+        # Share the intra-op thread budget the inference executor gave torch
+        self.set_num_threads(torch.get_num_threads())
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def set_num_threads(self, threads: int):
+        """
+        (Re)builds the session with `threads` intra-op threads. ONNX Runtime sizes
+        its pool when the session is created, so a session built before fork must
+        be rebuilt in each worker once its thread budget is known.
+        """
+        import onnxruntime as ort
+
+        if getattr(self, "num_threads", None) == threads:
+            return
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        self.num_threads = threads
+
+    def encode(self, texts: list[str], batch_size: int | None = None) -> torch.Tensor:
+        """Returns a (len(texts), 384) float32 tensor."""
+        texts = list(texts)
+        batch_size = batch_size or max(len(texts), 1)
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            features = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in features.items() if k in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            chunks.append(pooled.astype(np.float32))
+        return torch.from_numpy(np.concatenate(chunks, axis=0))
+
+
+def create_backend(name: str, st_model: "SentenceTransformer", onnx_path: str | None = None):
+    """Builds the named backend around a freshly loaded SentenceTransformer (which it takes ownership of)."""
+    if name == "fp32":
+        return TorchFP32Backend(st_model)
+    if name == "int8":
+        return TorchInt8Backend(st_model)
+    if name == "onnx":
+        return OnnxRuntimeBackend(st_model, onnx_path or "models/encoder.onnx")
+    raise ValueError(f"Unknown encoder backend '{name}'. Expected one of: {', '.join(BACKENDS)}")
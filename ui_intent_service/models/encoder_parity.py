@@ -0,0 +1,102 @@
+"""
+Encoder backend parity check.
+
+Encodes the prompts in data/train.csv with every backend and reports, relative
+to the fp32 reference: cosine drift (1 - cosine similarity, per prompt) and
+latency for single-prompt and batched calls. Backends whose optional packages
+are missing (onnx needs 'onnx' and 'onnxruntime') are reported as skipped.
+
+Usage: python3 -m models.encoder_parity [path_to_csv] [--json]
+"""
+import csv
+import json
+import sys
+import time
+import tempfile
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+from models.encoder import MODEL_NAME
+from models.encoder_backends import BACKENDS, create_backend
+
+
+def _percentile_ms(samples: list[float], q: float) -> float:
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def measure(backend, prompts: list[str], repeats: int = 3) -> dict:
+    """Latency of one backend: per-prompt (batch of 1) and whole-list batched calls."""
+    backend.encode(prompts[:4])  # warmup
+
+    single = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        backend.encode([prompt])
+        single.append(time.perf_counter() - start)
+
+    batched = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.encode(prompts)
+        batched.append(time.perf_counter() - start)
+
+    return {
+        "single_p50_ms": _percentile_ms(single, 50),
+        "single_p95_ms": _percentile_ms(single, 95),
+        "batch_ms": _percentile_ms(batched, 50),
+        "batch_size": len(prompts),
+    }
+
+
+def run_parity(prompts: list[str], onnx_path: str) -> dict:
+    report = {}
+    reference = None
+    for name in BACKENDS:
+        # Each backend owns (and may quantize) its own copy of the model
+        try:
+            backend = create_backend(name, SentenceTransformer(MODEL_NAME, device="cpu"), onnx_path=onnx_path)
+        except (RuntimeError, ImportError) as e:
+            print(f"Skipping {name}: {e}")
+            report[name] = {"skipped": str(e)}
+            continue
+        with torch.no_grad():
+            embeddings = backend.encode(prompts).detach().cpu().float()
+        assert embeddings.shape == (len(prompts), 384), f"{name} broke the (N, 384) contract: {tuple(embeddings.shape)}"
+
+        if reference is None:
+            reference = embeddings
+        cosine = torch.nn.functional.cosine_similarity(embeddings, reference, dim=1)
+        drift = (1.0 - cosine).numpy()
+
+        report[name] = {
+            "mean_cosine_drift": float(drift.mean()),
+            "max_cosine_drift": float(drift.max()),
+            **measure(backend, prompts),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    csv_path = args[0] if args else "data/train.csv"
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        prompts = [row["text"] for row in csv.DictReader(f)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_parity(prompts, onnx_path=f"{tmp}/encoder.onnx")
+
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n--- Encoder backend parity ({len(prompts)} prompts, reference: fp32) ---")
+        print(f"{'backend':<8} {'mean drift':>12} {'max drift':>12} {'p50 1x ms':>10} {'p95 1x ms':>10} {'batch ms':>10}")
+        for name, r in report.items():
+            if "skipped" in r:
+                print(f"{name:<8} skipped ({r['skipped']})")
+                continue
+            print(
+                f"{name:<8} {r['mean_cosine_drift']:>12.2e} {r['max_cosine_drift']:>12.2e} "
+                f"{r['single_p50_ms']:>10} {r['single_p95_ms']:>10} {r['batch_ms']:>10}"
+            )
@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import torch
+
+from models.ui_intent_model import UIIntentModel
+
+# Column layout of the fused (batch, 14) output
+CATEGORY_SLICE = slice(0, 3)
+COMPLEXITY_SLICE = slice(3, 6)
+COMPONENTS_SLICE = slice(6, 14)
+
+# Batches up to this size on the CPU skip torch dispatch and run in NumPy
+NUMPY_MAX_BATCH = int(os.getenv("FUSED_NUMPY_MAX_BATCH", "32"))
+
+class FusedIntentHeads:
+    """
+    Inference-only fused form of UIIntentModel.
+
+    The three linear heads (3 + 3 + 8 outputs) are concatenated into one
+    384x14 projection, so a forward pass is a single matmul. Both softmaxes
+    are computed together on a (batch, 2, 3) view and the sigmoid on the
+    remaining 8 columns, returning one (batch, 14) probability matrix:
+    [category probs | complexity probs | component probs].
+    """
+    def __init__(self, weight: torch.Tensor, bias: torch.Tensor, device: torch.device = torch.device("cpu")):
+        # weight: (14, input_size), bias: (14,) -- nn.Linear layout
+        self.device = device
+        self.weight_t = weight.detach().t().contiguous().to(device)  # (input_size, 14)
+        self.bias = bias.detach().contiguous().to(device)
+
+        # Host copies for the NumPy path
+        self.weight_np = np.ascontiguousarray(weight.detach().cpu().numpy().T, dtype=np.float32)
+        self.bias_np = np.ascontiguousarray(bias.detach().cpu().numpy(), dtype=np.float32)
+
+    @classmethod
+    def from_state_dict(cls, state_dict: dict, device: torch.device = torch.device("cpu")) -> "FusedIntentHeads":
+        """Builds the fused engine straight from a UIIntentModel state dict (e.g. ui_intent_heads.pt)."""
+        heads = ("category_head", "complexity_head", "components_head")
+        weight = torch.cat([state_dict[f"{h}.weight"].float() for h in heads], dim=0)
+        bias = torch.cat([state_dict[f"{h}.bias"].float() for h in heads], dim=0)
+        return cls(weight, bias, device)
+
+    @classmethod
+    def from_module(cls, model: UIIntentModel, device: torch.device | None = None) -> "FusedIntentHeads":
+        return cls.from_state_dict(model.state_dict(), device or next(model.parameters()).device)
+
+    def probabilities_torch(self, x: torch.Tensor) -> torch.Tensor:
+        """(batch, input_size) embeddings -> (batch, 14) probabilities, in torch."""
+        with torch.no_grad():
+            logits = torch.addmm(self.bias, x.to(self.device, torch.float32), self.weight_t)
+            probs = torch.empty_like(logits)
+            probs[:, :6] = torch.softmax(logits[:, :6].view(-1, 2, 3), dim=2).view(-1, 6)
+            probs[:, COMPONENTS_SLICE] = torch.sigmoid(logits[:, COMPONENTS_SLICE])
+        return probs
+
+    def probabilities_numpy(self, x: np.ndarray) -> np.ndarray:
+        """(batch, input_size) embeddings -> (batch, 14) probabilities, in NumPy."""
+        logits = x.astype(np.float32, copy=False) @ self.weight_np + self.bias_np
+        probs = np.empty_like(logits)
+
+        paired = logits[:, :6].reshape(-1, 2, 3)
+        exp = np.exp(paired - paired.max(axis=2, keepdims=True))
+        probs[:, :6] = (exp / exp.sum(axis=2, keepdims=True)).reshape(-1, 6)
+
+        # Overflow-free sigmoid
+        probs[:, COMPONENTS_SLICE] = 0.5 * (1.0 + np.tanh(0.5 * logits[:, COMPONENTS_SLICE]))
+        return probs
+
+    def predict_proba(self, x: torch.Tensor) -> np.ndarray:
+        """
+        Returns (batch, 14) probabilities as a host NumPy array, using the NumPy
+        path for small CPU batches and the torch path otherwise.
+        """
+        if x.device.type == "cpu" and x.shape[0] <= NUMPY_MAX_BATCH:
+            return self.probabilities_numpy(x.detach().numpy())
+        return self.probabilities_torch(x).cpu().numpy()
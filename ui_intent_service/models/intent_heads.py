@@ -0,0 +1,132 @@
+import io
+import os
+import hashlib
+import threading
+import torch
+
+from models.ui_intent_model import UIIntentModel
+from models.fused_heads import FusedIntentHeads
+
+WEIGHTS_PATH = os.getenv("INTENT_HEADS_PATH", "models/ui_intent_heads.pt")
+
+# Setup inference device
+device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
+
+_model = None
+_fused = None
+_weights_hash = None
+_model_version = None
+_weights_stat = None
+_load_lock = threading.Lock()
+
+def weights_file_hash(weights_path: str = WEIGHTS_PATH) -> str:
+    """SHA-256 of the weights file, or a per-process token for untrained heads."""
+    try:
+        with open(weights_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        # Untrained heads are randomly initialized, so they never match another process
+        return "untrained-" + os.urandom(8).hex()
+
+def weights_file_stat(weights_path: str = WEIGHTS_PATH) -> tuple | None:
+    """(inode, size, mtime_ns) of the weights file, or None if it is missing. Cheap enough to poll."""
+    try:
+        st = os.stat(weights_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def load_intent_model(weights_path: str = WEIGHTS_PATH, map_device: torch.device = device) -> UIIntentModel:
+    """
+    Builds a UIIntentModel in eval mode from a saved state dict.
+    The file is memory-mapped and its tensors are assigned in place (no copy)
+    when the target device is the CPU.
+    """
+    model = UIIntentModel(input_size=384)
+    try:
+        state_dict = torch.load(weights_path, map_location="cpu", weights_only=True, mmap=True)
+        model.load_state_dict(state_dict, assign=True)
+        print("Loaded trained model weights.")
+    except FileNotFoundError:
+        print("Warning: Trained weights not found. Using untrained initialization.")
+    model = model.to(map_device)
+    model.eval()
+    return model
+
+def get_intent_model() -> UIIntentModel:
+    """Returns the shared intent heads, loading them on first use."""
+    global _model, _weights_hash, _weights_stat
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                _weights_stat = weights_file_stat()
+                _weights_hash = weights_file_hash()
+                _model = load_intent_model()
+    return _model
+
+def model_version() -> str:
+    """
+    Short hash identifying everything that determines a prediction: the
+    encoder (model + backend) and the loaded head weights.
+    """
+    global _model_version
+    if _model_version is None:
+        from models.encoder import ENCODER_ID
+        get_intent_model()
+        _model_version = _version_for(ENCODER_ID, _weights_hash)
+    return _model_version
+
+def _version_for(encoder_id: str, weights_hash: str) -> str:
+    return hashlib.sha256(f"{encoder_id}|{weights_hash}".encode("utf-8")).hexdigest()[:16]
+
+def weights_hash() -> str | None:
+    """SHA-256 of the head weights currently serving (None before the first load)."""
+    return _weights_hash
+
+def loaded_weights_stat() -> tuple | None:
+    return _weights_stat
+
+def get_fused_heads() -> FusedIntentHeads:
+    """Returns the fused single-matmul engine built from the shared intent heads."""
+    global _fused
+    if _fused is None:
+        get_intent_model()
+        with _load_lock:
+            if _fused is None:
+                _fused = FusedIntentHeads.from_module(_model, device)
+    return _fused
+
+def is_loaded() -> bool:
+    return _model is not None
+
+def load_candidate(weights_path: str = WEIGHTS_PATH) -> tuple:
+    """
+    Loads heads from weights_path next to the active ones, without touching them.
+    The file is read once, so the returned hash always matches the loaded tensors
+    (no mmap: the file may be replaced again while these heads are serving).
+    Returns (model, fused, weights_hash, stat); raises if the file is unreadable
+    or does not match the UIIntentModel layout.
+    """
+    stat = weights_file_stat(weights_path)
+    with open(weights_path, "rb") as f:
+        data = f.read()
+    state_dict = torch.load(io.BytesIO(data), map_location="cpu", weights_only=True)
+    model = UIIntentModel(input_size=384)
+    model.load_state_dict(state_dict)  # strict: missing/unexpected keys or shape mismatches raise
+    model = model.to(device)
+    model.eval()
+    fused = FusedIntentHeads.from_module(model, device)
+    return model, fused, hashlib.sha256(data).hexdigest(), stat
+
+def activate(model: UIIntentModel, fused: FusedIntentHeads, new_weights_hash: str, stat: tuple | None):
+    """
+    Swaps in heads from load_candidate(). Only module globals are reassigned:
+    a batch that already fetched the old engine finishes with it, and the next
+    batch picks up the new one.
+    """
+    global _model, _fused, _weights_hash, _model_version, _weights_stat
+    from models.encoder import ENCODER_ID
+    with _load_lock:
+        _model, _fused = model, fused
+        _weights_hash, _weights_stat = new_weights_hash, stat
+        _model_version = _version_for(ENCODER_ID, new_weights_hash)
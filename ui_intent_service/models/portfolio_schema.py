@@ -106,3 +106,13 @@ class PortfolioSchema(BaseModel):
     )
     education: List[EducationEntry] = Field(default_factory=list)
     skills: List[SkillCategory] = Field(default_factory=list)
+
+
+class PortfolioChunkSchema(PortfolioSchema):
+    """
+    What one excerpt of a long resume may yield: every top-level field is
+    optional, since later excerpts usually have no header or summary. Merged
+    chunk results are validated against PortfolioSchema.
+    """
+    personal: Optional[PersonalDetails] = None
+    about: Optional[str] = None
@@ -0,0 +1,18 @@
+class KeywordMatcher:
+    """
+    Finds which of a fixed set of keywords occur in a text, as substrings.
+
+    find_all probes the text once per keyword (`kw in text`, a C-level
+    str.__contains__), so a call costs one substring search per keyword, not
+    a single pass over the text. The saving is at the call site: the planner
+    calls find_all once per prompt and shares the result between every rule
+    that needs it (layout, theme and override keywords alike), instead of each
+    rule rescanning the prompt. With the planner's few dozen short keywords
+    this takes a few microseconds per prompt, so no automaton is used.
+    """
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(keywords))
+
+    def find_all(self, text: str) -> frozenset:
+        """Returns the set of keywords that appear anywhere in text (case-sensitive)."""
+        return frozenset([kw for kw in self.keywords if kw in text])
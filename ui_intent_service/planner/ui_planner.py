@@ -1,40 +1,177 @@
 import random
+from types import MappingProxyType
 
-def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None = None) -> dict:
+from planner.keyword_matcher import KeywordMatcher
+
+# Bump whenever a rule change alters the plan produced for the same inputs;
+# it is part of the /plan cache key and ETag.
+PLANNER_VERSION = "1"
+
+# ---------------------------------------------------------------------------
+# Planner rules, compiled once at import into immutable tables
+# ---------------------------------------------------------------------------
+
+# 1. Layout mode keywords
+APP_KEYWORDS = ("app", "tool", "manager", "task", "board", "crm", "admin", "productivity", "internal")
+MKT_KEYWORDS = ("marketing", "landing", "promotion", "website", "campaign")
+
+# 1.5 Aesthetic theme flags (first keyword in this order wins)
+THEME_MAP = MappingProxyType({
+    "light": "theme-light",
+    "white": "theme-light",
+    "clean": "theme-light",
+    "neon": "theme-neon",
+    "cyber": "theme-neon",
+    "ocean": "theme-ocean",
+    "blue": "theme-ocean",
+    "forest": "theme-forest",
+    "green": "theme-forest",
+    "nature": "theme-forest",
+    "rose": "theme-rose",
+    "red": "theme-rose",
+    "monochrome": "theme-monochrome",
+    "grayscale": "theme-monochrome",
+    "black": "theme-dark",
+    "dark": "theme-dark"
+})
+DEFAULT_THEME = "theme-dark"
+
+# B) Section budget per complexity label (anything else -> standard)
+BASE_BUDGET = MappingProxyType({"simple": 3, "rich": 10})
+DEFAULT_BUDGET = 6
+
+# 2. Base templates: (layout_mode, complexity) -> (sections, minimum budget)
+BASE_TEMPLATES = MappingProxyType({
+    ("application", "simple"): (("topbar", "sidebar", "board"), 3),
+    ("application", "rich"): (("topbar", "sidebar", "board", "table", "activityFeed", "footer"), 6),
+    ("application", "standard"): (("topbar", "sidebar", "board", "statsStrip", "footer"), 5),
+    ("dashboard", "simple"): (("hero", "kpiTiles", "chartPanel"), 3),
+    ("dashboard", "rich"): (("hero", "kpiTiles", "chartPanel", "table", "projectsGrid", "footer"), 6),
+    ("dashboard", "standard"): (("hero", "kpiTiles", "chartPanel", "footer"), 4),
+    ("creative", "simple"): (("fullscreenHero", "marqueeBand", "splitReveal", "bentoGrid", "footer"), 5),
+    ("creative", "rich"): (("fullscreenHero", "marqueeBand", "splitReveal", "bentoGrid", "interactiveCardGrid", "horizontalGallery", "footer"), 7),
+    ("creative", "standard"): (("fullscreenHero", "marqueeBand", "splitReveal", "bentoGrid", "horizontalGallery", "footer"), 6),
+    ("landing", "simple"): (("hero", "featuresRow", "footer"), 3),
+    ("landing", "rich"): (("hero", "featuresRow", "projectsGrid", "kpiTiles", "ctaBand", "contactForm", "footer"), 7),
+    ("landing", "standard"): (("hero", "featuresRow", "kpiTiles", "ctaBand", "footer"), 5),
+})
+
+# Map component aliases to canonical names to prevent React 1-to-many renderer duplication
+CANONICAL_MAP = MappingProxyType({
+    "marquee": "marqueeBand",
+    "bento": "bentoGrid",
+    "features": "featuresRow",
+    "split": "splitReveal",
+    "kpiCards": "kpiTiles",
+    "chart": "chartPanel",
+    "gallery": "horizontalGallery",
+    "cta": "ctaBand"
+})
+
+# 4. Master dictionary for standard logical UI sorting weight
+MASTER_ORDER = MappingProxyType({
+    "topbar": 0,
+    "sidebar": 1,
+    "hero": 2,
+    "fullscreenHero": 2,
+    "marqueeBand": 3,
+    "splitReveal": 4,
+    "board": 5,
+    "statsStrip": 6,
+    "activityFeed": 7,
+    "bentoGrid": 8,
+    "featuresRow": 9,
+    "features": 9,
+    "projectsGrid": 10,
+    "interactiveCardGrid": 10,
+    "gallery": 11,
+    "horizontalGallery": 11,
+    "kpiTiles": 12,
+    "kpiCards": 12,
+    "chartPanel": 13,
+    "chart": 13,
+    "table": 14,
+    "ctaBand": 15,
+    "contactForm": 16,
+    "footer": 99
+})
+
+# G) Explanation templates
+LAYOUT_REASONS = MappingProxyType({
+    "application": "Application topology selected to support complex interactive workflows and internal tool structures.",
+    "dashboard": "Dashboard topology selected to support analytical metrics and data visualization elements.",
+    "creative": "Creative gallery topology selected to highlight visual portfolios and case studies.",
+    "landing": "Standard landing topology selected to drive conversion and feature marketing.",
+})
+COMPLEXITY_REASONS = MappingProxyType({
+    "simple": "Minimalist component density chosen for a clean, focused user experience.",
+    "rich": "High-density component architecture chosen to present comprehensive information and interactive elements.",
+    "standard": "Standard component density chosen for a balanced structural flow.",
+})
+
+# Keyword intercepts applied after planning to bypass the frozen model weights for
+# newer modules: (prompt keyword, section types it may replace, replacement).
+# Each replacement is injected at most once; the first matching rule wins.
+KEYWORD_OVERRIDES = (
+    ("fullscreen", frozenset({"hero"}), "fullscreenHero"),
+    ("bento", frozenset({"features", "featuresRow"}), "bentoGrid"),
+    ("marquee", frozenset({"projectsGrid", "contactForm", "ctaBand"}), "marqueeBand"),
+    ("split", frozenset({"projectsGrid", "featuresRow", "features"}), "splitReveal"),
+    ("gallery", frozenset({"projectsGrid", "featuresRow", "features"}), "horizontalGallery"),
+)
+
+# One matcher for every prompt keyword the planner and the overrides look at
+PROMPT_MATCHER = KeywordMatcher(
+    APP_KEYWORDS + MKT_KEYWORDS + tuple(THEME_MAP) + tuple(kw for kw, _, _ in KEYWORD_OVERRIDES)
+)
+
+# Shared source for unseeded plans; seeding a fresh Random from os.urandom per call costs more than the plan
+_UNSEEDED_RNG = random.Random()
+
+ID_ALPHABET = "abcdef0123456789"
+
+def _random_id(rng: random.Random, k: int = 6) -> str:
+    """Same draws and output as "".join(rng.choices(ID_ALPHABET, k=k)), minus its per-call overhead."""
+    random_ = rng.random
+    return "".join([ID_ALPHABET[int(random_() * 16)] for _ in range(k)])
+
+def match_prompt_keywords(prompt: str) -> frozenset:
+    """Scans the lowercased prompt once and returns every planner keyword it contains."""
+    return PROMPT_MATCHER.find_all(prompt.lower())
+
+def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None = None,
+                     matched_keywords: frozenset | None = None) -> dict:
     """
     Takes the structured output from the ML prediction and generates a
     deterministic UI plan respecting business logic, budgets, and design DNA.
+
+    Seeded plans draw from their own random.Random(seed), so they are
+    reproducible even when several plans are generated concurrently.
+    matched_keywords may be passed in if the prompt was already scanned.
     """
-    if seed is not None:
-        random.seed(seed)
+    rng = random.Random(seed) if seed is not None else _UNSEEDED_RNG
         
     category_data = prediction_output.get("category", {})
     complexity_data = prediction_output.get("complexity", {})
     components_data = prediction_output.get("components", [])
     
-    prompt_lower = prompt.lower()
+    if matched_keywords is None:
+        matched_keywords = match_prompt_keywords(prompt)
     
     cat_label = category_data.get("label", "unknown")
     cat_conf = category_data.get("confidence", 0.0)
     comp_label = complexity_data.get("label", "standard")
+    complexity_key = comp_label if comp_label in ("simple", "rich") else "standard"
     
     # A) Confidence Handling
     needs_clarification = bool(cat_conf < 0.6)
     
     # B) Section Budget Rules
-    if comp_label == "simple":
-        budget = 3
-    elif comp_label == "rich":
-        budget = 10
-    else:
-        budget = 6
+    budget = BASE_BUDGET.get(comp_label, DEFAULT_BUDGET)
         
     # 1. Determine Layout Mode
-    app_keywords = ["app", "tool", "manager", "task", "board", "crm", "admin", "productivity", "internal"]
-    mkt_keywords = ["marketing", "landing", "promotion", "website", "campaign"]
-    
-    has_app = any(kw in prompt_lower for kw in app_keywords)
-    has_mkt = any(kw in prompt_lower for kw in mkt_keywords)
+    has_app = not matched_keywords.isdisjoint(APP_KEYWORDS)
+    has_mkt = not matched_keywords.isdisjoint(MKT_KEYWORDS)
 
     if has_app and not has_mkt:
         layout_mode = "application"
@@ -46,98 +183,30 @@ def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None
         layout_mode = "landing"
         
     # 1.5 Determine Aesthetic Theme Flag
-    theme_map = {
-        "light": "theme-light",
-        "white": "theme-light",
-        "clean": "theme-light",
-        "neon": "theme-neon",
-        "cyber": "theme-neon",
-        "ocean": "theme-ocean",
-        "blue": "theme-ocean",
-        "forest": "theme-forest",
-        "green": "theme-forest",
-        "nature": "theme-forest",
-        "rose": "theme-rose",
-        "red": "theme-rose",
-        "monochrome": "theme-monochrome",
-        "grayscale": "theme-monochrome",
-        "black": "theme-dark",
-        "dark": "theme-dark"
-    }
-    
-    selected_theme = "theme-dark" # Fallback/Default
-    for kw, cls in theme_map.items():
-        if kw in prompt_lower:
-            selected_theme = cls
-            break
+    selected_theme = DEFAULT_THEME # Fallback/Default
+    if not matched_keywords.isdisjoint(THEME_MAP):
+        for kw, cls in THEME_MAP.items():
+            if kw in matched_keywords:
+                selected_theme = cls
+                break
     
     # 2. Base Templates (ensuring standard templates requested)
-    if layout_mode == "application":
-        if comp_label == "simple":
-            base_template = ["topbar", "sidebar", "board"]
-            budget = max(budget, 3)
-        elif comp_label == "rich":
-            base_template = ["topbar", "sidebar", "board", "table", "activityFeed", "footer"]
-            budget = max(budget, 6)
-        else: # standard
-            base_template = ["topbar", "sidebar", "board", "statsStrip", "footer"]
-            budget = max(budget, 5)
-    elif layout_mode == "dashboard":
-        if comp_label == "simple":
-            base_template = ["hero", "kpiTiles", "chartPanel"]
-            budget = max(budget, 3)
-        elif comp_label == "rich":
-            base_template = ["hero", "kpiTiles", "chartPanel", "table", "projectsGrid", "footer"]
-            budget = max(budget, 6)
-        else: # standard
-            base_template = ["hero", "kpiTiles", "chartPanel", "footer"]
-            budget = max(budget, 4)
-    elif layout_mode == "creative":
-        if comp_label == "simple":
-            base_template = ["fullscreenHero", "marqueeBand", "splitReveal", "bentoGrid", "footer"]
-            budget = max(budget, 5)
-        elif comp_label == "rich":
-            base_template = ["fullscreenHero", "marqueeBand", "splitReveal", "bentoGrid", "interactiveCardGrid", "horizontalGallery", "footer"]
-            budget = max(budget, 7)
-        else: # standard
-            base_template = ["fullscreenHero", "marqueeBand", "splitReveal", "bentoGrid", "horizontalGallery", "footer"]
-            budget = max(budget, 6)
-    else: # landing
-        if comp_label == "simple":
-            base_template = ["hero", "featuresRow", "footer"]
-            budget = max(budget, 3)
-        elif comp_label == "rich":
-            base_template = ["hero", "featuresRow", "projectsGrid", "kpiTiles", "ctaBand", "contactForm", "footer"]
-            budget = max(budget, 7)
-        else: # standard
-            base_template = ["hero", "featuresRow", "kpiTiles", "ctaBand", "footer"]
-            budget = max(budget, 5)
+    base_template, min_budget = BASE_TEMPLATES[(layout_mode, complexity_key)]
+    budget = max(budget, min_budget)
 
     # 3. Component Selection (Merge predicted components up to budget)
     selected_names = list(base_template)
     
     # Sort ML inferred components descending by probability
     sorted_comps = sorted(components_data, key=lambda x: x.get("prob", 0.0), reverse=True)
-    
-    # Map component aliases to canonical names to prevent React 1-to-many renderer duplication
-    canonical_map = {
-        "marquee": "marqueeBand",
-        "bento": "bentoGrid",
-        "features": "featuresRow",
-        "split": "splitReveal",
-        "kpiCards": "kpiTiles",
-        "chart": "chartPanel",
-        "gallery": "horizontalGallery",
-        "cta": "ctaBand"
-    }
 
     for c in sorted_comps:
         if len(selected_names) >= budget:
             break
         c_name = c.get("name")
-        c_name = canonical_map.get(c_name, c_name)  # Normalize
+        c_name = CANONICAL_MAP.get(c_name, c_name)  # Normalize
         
-        if layout_mode == "application" and c_name in ["hero", "fullscreenHero"]:
+        if layout_mode == "application" and c_name in ("hero", "fullscreenHero"):
             continue
             
         # Also ensure we don't have multiple heroes
@@ -150,36 +219,8 @@ def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None
             selected_names.append(c_name)
 
     # 4. Enforce Unified Section Ordering Rules
-    # Master dictionary for standard logical UI sorting weight
-    master_order = {
-        "topbar": 0,
-        "sidebar": 1,
-        "hero": 2,
-        "fullscreenHero": 2,
-        "marqueeBand": 3,
-        "splitReveal": 4,
-        "board": 5,
-        "statsStrip": 6,
-        "activityFeed": 7,
-        "bentoGrid": 8,
-        "featuresRow": 9,
-        "features": 9,
-        "projectsGrid": 10,
-        "interactiveCardGrid": 10,
-        "gallery": 11,
-        "horizontalGallery": 11,
-        "kpiTiles": 12,
-        "kpiCards": 12,
-        "chartPanel": 13,
-        "chart": 13,
-        "table": 14,
-        "ctaBand": 15,
-        "contactForm": 16,
-        "footer": 99
-    }
-    
     # Safely sort the selected names using the master dict (fallbacks to end if unknown ML label)
-    final_ordered = sorted(selected_names, key=lambda x: master_order.get(x, 50))
+    final_ordered = sorted(selected_names, key=lambda x: MASTER_ORDER.get(x, 50))
     
     # Format into structured payload assigning deterministic variants safely
     sections = []
@@ -188,7 +229,7 @@ def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None
         if layout_mode == "dashboard" and s_name == "hero":
             var = "compact"
         else:
-            var = random.choice(["v1", "v2", "v3"])
+            var = rng.choice(["v1", "v2", "v3"])
             
         sections.append({
             "type": s_name,
@@ -197,36 +238,20 @@ def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None
         
     # F) Design DNA
     design_dna = {
-        "tone": random.choice(["minimal", "bold", "corporate"]),
-        "palette": random.choice(["blue", "dark", "neutral"]),
-        "density": random.choice(["compact", "spacious"]),
-        "radius": random.choice(["sm", "md", "lg"]),
+        "tone": rng.choice(["minimal", "bold", "corporate"]),
+        "palette": rng.choice(["blue", "dark", "neutral"]),
+        "density": rng.choice(["compact", "spacious"]),
+        "radius": rng.choice(["sm", "md", "lg"]),
         "theme": selected_theme
     }
     
     # G) Explanation
-    if layout_mode == "application":
-        layout_reason = "Application topology selected to support complex interactive workflows and internal tool structures."
-    elif layout_mode == "dashboard":
-        layout_reason = "Dashboard topology selected to support analytical metrics and data visualization elements."
-    elif layout_mode == "creative":
-        layout_reason = "Creative gallery topology selected to highlight visual portfolios and case studies."
-    else:
-        layout_reason = "Standard landing topology selected to drive conversion and feature marketing."
-
-    if comp_label == "simple":
-        complexity_reason = "Minimalist component density chosen for a clean, focused user experience."
-    elif comp_label == "rich":
-        complexity_reason = "High-density component architecture chosen to present comprehensive information and interactive elements."
-    else:
-        complexity_reason = "Standard component density chosen for a balanced structural flow."
-
     section_reason = f"Base layout constructed using the '{layout_mode}' blueprint to establish an intuitive viewing hierarchy."
     ml_reason = f"Augmented with additional sections injected dynamically via semantic intent prediction (Confidence: {cat_conf*100:.1f}%)."
 
     explanation = {
-        "layout_reason": layout_reason,
-        "complexity_reason": complexity_reason,
+        "layout_reason": LAYOUT_REASONS[layout_mode],
+        "complexity_reason": COMPLEXITY_REASONS[complexity_key],
         "section_reason": section_reason,
         "ml_reason": ml_reason
     }
@@ -243,8 +268,8 @@ def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None
             block_type = s_type[0].upper() + s_type[1:]
             
         # Generate stable pseudo-random IDs
-        sec_rnd = "".join(random.choices("abcdef0123456789", k=6))
-        blk_rnd = "".join(random.choices("abcdef0123456789", k=6))
+        sec_rnd = _random_id(rng)
+        blk_rnd = _random_id(rng)
         
         tree_children.append({
             "id": f"sec_{s_type}_{sec_rnd}",
@@ -273,3 +298,30 @@ def generate_ui_plan(prediction_output: dict, prompt: str = "", seed: int | None
         "designDNA": design_dna,
         "explanation": explanation
     }
+
+def apply_keyword_overrides(ui_plan: dict, matched_keywords: frozenset) -> dict:
+    """
+    Applies KEYWORD_OVERRIDES (at most one injection per replacement type) and
+    then drops duplicate section types as a failsafe. Mutates and returns ui_plan.
+    """
+    active_rules = [rule for rule in KEYWORD_OVERRIDES if rule[0] in matched_keywords]
+    injected_overrides = set()
+
+    if active_rules:
+        for sec in ui_plan.get("sections", []):
+            for _, sources, replacement in active_rules:
+                if sec["type"] in sources and replacement not in injected_overrides:
+                    sec["type"] = replacement
+                    injected_overrides.add(replacement)
+                    break
+
+    # Final deduplication loop as a failsafe
+    seen = set()
+    deduped_sections = []
+    for s in ui_plan.get("sections", []):
+        if s["type"] not in seen:
+            seen.add(s["type"])
+            deduped_sections.append(s)
+    ui_plan["sections"] = deduped_sections
+
+    return ui_plan
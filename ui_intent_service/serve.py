@@ -0,0 +1,209 @@
+"""
+Production launcher: pre-fork workers that share model weights copy-on-write.
+
+The parent process imports the app, loads the MiniLM encoder and the intent
+heads once, freezes them (no grads, gc.freeze() so the collector never writes
+to their object headers) and then forks N uvicorn workers on one shared
+listening socket. Weight tensors are only ever read, so their pages stay
+shared between the parent and every worker; each worker privately owns just
+its interpreter state, torch runtime buffers and request-time allocations.
+
+Each worker gets its own slice of CPUs (sched_setaffinity) and a matching
+torch intra-op thread count, so workers do not oversubscribe cores. With
+ENCODER_BACKEND=onnx the parent's single-threaded session is rebuilt in each
+worker with that thread count (the rebuilt session's weights are private to
+the worker).
+
+Memory: run with --report-memory to print per-worker RSS / PSS / USS from
+/proc/<pid>/smaps_rollup 5 s after the workers start. One run on Linux with
+the fp32 all-MiniLM-L6-v2 encoder, `python3 serve.py --workers 2
+--report-memory`, printed:
+  [serve] parent  pid 29592: RSS 856.3 MB, PSS 501.5 MB, USS 330.6 MB
+  [serve] worker  pid 29649: RSS 566.5 MB, PSS 211.9 MB, USS 32.3 MB
+  [serve] worker  pid 29650: RSS 566.5 MB, PSS 211.8 MB, USS 32.3 MB
+  [serve] Private memory per added worker (avg USS): 32.3 MB
+On the same machine, a standalone `uvicorn main:app` process was at 886 MB
+RSS and 867 MB USS once /health/ready answered. Private memory grows with
+request-time allocations, so re-check under load.
+
+Usage: python3 serve.py --workers 4 [--port 8000] [--report-memory]
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+
+# Forking after tokenizer parallelism has been used deadlocks the Rust pool
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+# Models are loaded here explicitly; workers only warm up
+os.environ.setdefault("PRELOAD_MODELS", "1")
+
+
+def preload_models():
+    """Loads and freezes every model in the parent, before any fork."""
+    import torch
+    # Import the app here so its modules are shared with every worker too
+    import main  # noqa: F401
+    from models import encoder
+    from models.intent_heads import get_intent_model, get_fused_heads
+    from models.cascade import get_cascade
+
+    # No torch compute (and so no OpenMP pool) may start before fork. This also
+    # keeps an ONNX session single-threaded here; run_worker resizes it.
+    torch.set_num_threads(1)
+
+    start = time.perf_counter()
+    encoder.get_backend()
+    heads = get_intent_model()
+    get_fused_heads()
+    get_cascade()
+    for param in heads.parameters():
+        param.requires_grad = False
+    print(f"[serve] Models loaded in parent in {time.perf_counter() - start:.2f}s.")
+
+
+def cpu_slices(workers: int) -> list[list[int]]:
+    """Splits the CPUs this process may use into one contiguous slice per worker."""
+    cpus = sorted(os.sched_getaffinity(0))
+    if workers >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(workers)]
+    per_worker = len(cpus) // workers
+    return [cpus[i * per_worker:(i + 1) * per_worker] for i in range(workers)]
+
+
+def run_worker(sock: socket.socket, cpus: list[int] | None, threads: int, args):
+    import torch
+    import uvicorn
+    import main
+
+    from models import encoder
+
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(threads)
+    # The ONNX session was built in the parent with one thread; give it this worker's budget
+    if hasattr(encoder.backend, "set_num_threads"):
+        encoder.backend.set_num_threads(threads)
+
+    config = uvicorn.Config(main.app, host=args.host, port=args.port, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def memory_report(pids: list[int]) -> list[dict]:
+    """RSS, PSS and USS (private) per process, in MB, from smaps_rollup."""
+    rows = []
+    for pid in pids:
+        fields = {}
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                        fields[parts[0][:-1]] = int(parts[1])
+        except OSError:
+            continue
+        uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+        rows.append({
+            "pid": pid,
+            "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+            "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+            "uss_mb": round(uss / 1024, 1),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork launcher for the UI Intent Service")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="torch intra-op threads per worker (default: size of the worker's CPU slice)")
+    parser.add_argument("--no-affinity", action="store_true", help="do not pin workers to CPU slices")
+    parser.add_argument("--report-memory", action="store_true", help="print per-worker RSS/PSS/USS after startup")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    preload_models()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Everything allocated so far is long-lived; keep the GC off those pages
+    gc.collect()
+    gc.freeze()
+
+    slices = cpu_slices(args.workers)
+    workers: dict[int, int] = {}
+
+    def spawn(index: int):
+        cpus = None if args.no_affinity else slices[index]
+        threads = args.threads_per_worker or (len(cpus) if cpus else max(1, (os.cpu_count() or 1) // args.workers))
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(sock, cpus, threads, args)
+            except BaseException as e:
+                print(f"[serve] Worker {index} crashed: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = index
+        print(f"[serve] Worker {index} started (pid {pid}, cpus {cpus or 'any'}, torch threads {threads}).")
+
+    for i in range(args.workers):
+        spawn(i)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    if args.report_memory:
+        time.sleep(5)
+        parent = memory_report([os.getpid()])
+        children = memory_report(list(workers))
+        for row in parent:
+            print(f"[serve] parent  pid {row['pid']}: RSS {row['rss_mb']} MB, PSS {row['pss_mb']} MB, USS {row['uss_mb']} MB")
+        for row in children:
+            print(f"[serve] worker  pid {row['pid']}: RSS {row['rss_mb']} MB, PSS {row['pss_mb']} MB, USS {row['uss_mb']} MB")
+        if children:
+            avg_uss = sum(r["uss_mb"] for r in children) / len(children)
+            print(f"[serve] Private memory per added worker (avg USS): {avg_uss:.1f} MB")
+
+    # Supervise: restart workers that die unexpectedly
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = workers.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"[serve] Worker {index} (pid {pid}) exited with status {status}; restarting.")
+            spawn(index)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
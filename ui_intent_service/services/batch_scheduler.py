@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+
+class MicroBatchScheduler:
+    """
+    Collects concurrent inference requests into micro-batches.
+
+    Callers submit single items and block on their own result. A background
+    thread groups whatever arrives within a short window (bounded by
+    max_batch_size and max_wait_ms) and runs batch_fn once for the whole group,
+    so the encoder sees one batched forward pass instead of N singletons.
+
+    batch_fn receives a list of items and must return a list of results in the
+    same order.
+    """
+    def __init__(self, batch_fn: Callable[[list], list], max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the batching thread (idempotent)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="micro-batch-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Signals the batching thread to exit after draining queued requests."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+                self._thread.join()
+            self._thread = None
+
+    def submit(self, item) -> Future:
+        """Queues a single item and returns a Future for its result."""
+        if self._thread is None:
+            self.start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def depth(self) -> int:
+        """Items queued but not yet picked up by the batching thread."""
+        return self._queue.qsize()
+
+    def run(self, item, timeout: float | None = None):
+        """Submits an item and blocks until its result is available."""
+        return self.submit(item).result(timeout=timeout)
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            # Collect more requests until the batch is full or the window closes
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            self._run_batch(batch)
+            if stopping:
+                return
+
+    def _run_batch(self, batch: list):
+        # Skip requests whose callers have already given up
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = list(self.batch_fn([item for item, _ in batch]))
+            if len(results) != len(batch):
+                # zip() would leave the unmatched callers waiting forever
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
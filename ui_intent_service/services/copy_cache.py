@@ -0,0 +1,139 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class _Bucket:
+    """Entries for one (layout_mode, sections) key: an embedding matrix plus parallel metadata."""
+    def __init__(self, dim: int, capacity: int = 8):
+        self.embeddings = np.zeros((capacity, dim), dtype=np.float32)
+        self.values: list = []
+        self.created: list[float] = []
+        self.last_used: list[float] = []
+        self.latency: list[float] = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, vector: np.ndarray, value: dict, now: float, latency: float):
+        row = len(self.values)
+        if row == self.embeddings.shape[0]:
+            # Grow geometrically; buckets start small since most keys see few prompts
+            grown = np.zeros((row * 2, self.embeddings.shape[1]), dtype=np.float32)
+            grown[:row] = self.embeddings
+            self.embeddings = grown
+        self.embeddings[row] = vector
+        self.values.append(value)
+        self.created.append(now)
+        self.last_used.append(now)
+        self.latency.append(latency)
+
+    def remove(self, i: int):
+        last = len(self.values) - 1
+        if i != last:
+            # Swap-remove keeps the matrix rows contiguous
+            self.embeddings[i] = self.embeddings[last]
+            for column in (self.values, self.created, self.last_used, self.latency):
+                column[i] = column[last]
+        for column in (self.values, self.created, self.last_used, self.latency):
+            column.pop()
+
+
+class SemanticCopyCache:
+    """
+    Semantic cache for /generate-copy responses.
+
+    Entries are grouped by an exact key (layout_mode + the set of sections).
+    Within a key, a lookup is one vectorized cosine-similarity search of the
+    prompt embedding against every cached prompt embedding; the best match is
+    served if it clears `threshold`. Entries expire after `ttl_seconds`, each
+    key keeps at most `max_entries_per_key` (least recently used evicted) and
+    at most `max_keys` keys are kept (least recently used evicted).
+    """
+    def __init__(self, threshold: float = 0.92, ttl_seconds: float = 3600.0, max_entries_per_key: int = 256,
+                 max_keys: int = 512, dim: int = 384):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_entries_per_key = max(1, max_entries_per_key)
+        self.max_keys = max(1, max_keys)
+        self.dim = dim
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency_seconds = 0.0
+
+        self._buckets: OrderedDict[tuple, _Bucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(layout_mode: str, sections: list) -> tuple:
+        return (str(layout_mode), tuple(sorted(str(s) for s in sections)))
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, key: tuple, embedding) -> dict | None:
+        """Returns the cached response for the most similar prompt under key, if similar enough."""
+        query = self._unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or len(bucket) == 0:
+                self.misses += 1
+                return None
+            self._buckets.move_to_end(key)
+
+            similarities = bucket.embeddings[:len(bucket)] @ query
+            # Expired entries never match
+            expired = now - np.asarray(bucket.created) > self.ttl
+            similarities[expired] = -np.inf
+            best = int(np.argmax(similarities))
+
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            bucket.last_used[best] = now
+            self.hits += 1
+            self.saved_latency_seconds += bucket.latency[best]
+            return bucket.values[best]
+
+    def insert(self, key: tuple, embedding, value: dict, latency_seconds: float):
+        """Stores a fresh response along with how long the LLM took to produce it."""
+        vector = self._unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = _Bucket(self.dim)
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+
+            # Drop expired entries, then the least recently used one if still full
+            for i in reversed(range(len(bucket))):
+                if now - bucket.created[i] > self.ttl:
+                    bucket.remove(i)
+            if len(bucket) >= self.max_entries_per_key:
+                bucket.remove(int(np.argmin(bucket.last_used)))
+
+            bucket.append(vector, value, now, latency_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "keys": len(self._buckets),
+                "entries": sum(len(b) for b in self._buckets.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "saved_latency_seconds": round(self.saved_latency_seconds, 3),
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,186 @@
+"""
+Hot reload of the intent-head weights (models/ui_intent_heads.pt).
+
+The encoder stays loaded; only the 384x14 heads are swapped. A reload loads
+the new file next to the active heads and runs a smoke set through them. The
+swap happens only if the outputs are sane, and it is a plain reference swap
+(models.intent_heads.activate), so in-flight batches finish on the old heads
+and no request is dropped. After a swap, on_swap runs so that caches keyed by
+model version can be invalidated.
+
+Reloads are triggered by polling the file's stat (HEADS_RELOAD_POLL_SECONDS,
+0 disables it) or by calling reload() directly (the admin endpoint). Under
+serve.py every worker polls on its own, so polling is what reaches all
+workers; an admin call only reloads the worker that received it.
+"""
+import os
+import threading
+
+import numpy as np
+
+from models import intent_heads
+from models.encoder import encode_texts
+from models.fused_heads import CATEGORY_SLICE, COMPLEXITY_SLICE, COMPONENTS_SLICE
+from services import metrics
+
+HEADS_RELOAD_POLL_SECONDS = float(os.getenv("HEADS_RELOAD_POLL_SECONDS", "5"))
+# Required smoke-set category accuracy; 0 only checks that outputs are well-formed
+HEADS_SMOKE_MIN_ACCURACY = float(os.getenv("HEADS_SMOKE_MIN_ACCURACY", "0"))
+
+CATEGORY_LABELS = ["portfolio", "landing", "dashboard"]
+
+# (prompt, expected category)
+SMOKE_SET = [
+    ("minimal portfolio website with projects and contact form", "portfolio"),
+    ("a photography site to show my pictures", "portfolio"),
+    ("personal site for a designer with case studies", "portfolio"),
+    ("saas landing page with features and pricing", "landing"),
+    ("landing page for a mobile app launch with a signup form", "landing"),
+    ("marketing page for a startup product", "landing"),
+    ("admin dashboard with charts, kpi cards and a table", "dashboard"),
+    ("analytics dashboard showing sales metrics", "dashboard"),
+    ("internal tool to monitor server health with graphs", "dashboard"),
+]
+
+
+class HeadsValidationError(Exception):
+    """Candidate heads failed the smoke set; the active heads were kept."""
+    def __init__(self, reason: str, report: dict):
+        super().__init__(reason)
+        self.reason = reason
+        self.report = report
+
+
+def smoke_check(fused, embeddings, expected: list, active=None, min_accuracy: float = HEADS_SMOKE_MIN_ACCURACY) -> dict:
+    """
+    Runs the smoke embeddings through candidate heads. Raises HeadsValidationError
+    on non-finite or malformed probabilities, or on category accuracy below
+    min_accuracy. Returns a report, including agreement with the active heads.
+    """
+    probs = fused.predict_proba(embeddings)
+    report = {"prompts": len(expected)}
+
+    if probs.shape != (len(expected), 14) or not np.isfinite(probs).all():
+        raise HeadsValidationError("non-finite or misshapen head outputs", report)
+    if probs.min() < 0.0 or probs.max() > 1.0:
+        raise HeadsValidationError("probabilities outside [0, 1]", report)
+    for name, cols in (("category", CATEGORY_SLICE), ("complexity", COMPLEXITY_SLICE)):
+        if not np.allclose(probs[:, cols].sum(axis=1), 1.0, atol=1e-3):
+            raise HeadsValidationError(f"{name} probabilities do not sum to 1", report)
+
+    predicted = [CATEGORY_LABELS[i] for i in probs[:, CATEGORY_SLICE].argmax(axis=1)]
+    accuracy = sum(p == e for p, e in zip(predicted, expected)) / len(expected)
+    report["category_accuracy"] = round(accuracy, 3)
+    report["components_mean"] = round(float((probs[:, COMPONENTS_SLICE] > 0.5).sum(axis=1).mean()), 2)
+
+    if active is not None:
+        active_probs = active.predict_proba(embeddings)
+        report["category_agreement"] = round(float(
+            (active_probs[:, CATEGORY_SLICE].argmax(axis=1) == probs[:, CATEGORY_SLICE].argmax(axis=1)).mean()
+        ), 3)
+
+    if accuracy < min_accuracy:
+        raise HeadsValidationError(f"smoke-set category accuracy {accuracy:.2f} is below {min_accuracy:.2f}", report)
+    return report
+
+
+class HeadsReloader:
+    def __init__(self, on_swap=None, poll_seconds: float = HEADS_RELOAD_POLL_SECONDS,
+                 weights_path: str = intent_heads.WEIGHTS_PATH):
+        self.on_swap = on_swap
+        self.poll_seconds = poll_seconds
+        self.weights_path = weights_path
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_smoke = None
+        self._lock = threading.Lock()  # one reload at a time
+        self._stop = threading.Event()
+        self._thread = None
+        self._skip_stat = None
+        self._smoke_embeddings = None
+
+    def reload(self, force: bool = False) -> dict:
+        """
+        Loads, validates and swaps in the weights file. Without force, a file
+        whose hash matches the active heads is left alone. Raises
+        HeadsValidationError (or the load error) and keeps the active heads on failure.
+        """
+        with self._lock:
+            previous = intent_heads.weights_hash()
+            try:
+                model, fused, new_hash, stat = intent_heads.load_candidate(self.weights_path)
+            except Exception as e:
+                self._record_failure(intent_heads.weights_file_stat(self.weights_path), f"load failed: {e}")
+                raise
+
+            if new_hash == previous and not force:
+                self._skip_stat = stat  # e.g. touched or rewritten with the same bytes
+                return {"reloaded": False, "reason": "unchanged", **self.status()}
+
+            if self._smoke_embeddings is None:
+                self._smoke_embeddings = encode_texts([prompt for prompt, _ in SMOKE_SET])
+            active = intent_heads.get_fused_heads() if intent_heads.is_loaded() else None
+            try:
+                smoke = smoke_check(fused, self._smoke_embeddings, [label for _, label in SMOKE_SET], active)
+            except HeadsValidationError as e:
+                self.last_smoke = e.report
+                self._record_failure(stat, f"validation failed: {e.reason}")
+                raise
+
+            intent_heads.activate(model, fused, new_hash, stat)
+            if self.on_swap is not None:
+                self.on_swap()
+            self.reloads += 1
+            self.last_error = None
+            self.last_smoke = smoke
+            self._skip_stat = None
+            metrics.HEADS_RELOADS.inc("swapped")
+            print(f"Intent heads reloaded: {(previous or 'none')[:12]} -> {new_hash[:12]} (smoke: {smoke})")
+            return {"reloaded": True, "previous_weights_hash": previous, **self.status()}
+
+    def _record_failure(self, stat, error: str):
+        # Remember the rejected file so polling does not retry it until it changes again
+        self._skip_stat = stat
+        self.failures += 1
+        self.last_error = error
+        metrics.HEADS_RELOADS.inc("rejected")
+        print(f"Intent head reload rejected, keeping the active heads: {error}")
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_seconds):
+            # Nothing to replace until the heads are loaded the first time (lazily or by warmup)
+            if not intent_heads.is_loaded():
+                continue
+            stat = intent_heads.weights_file_stat(self.weights_path)
+            if stat is None or stat == intent_heads.loaded_weights_stat() or stat == self._skip_stat:
+                continue
+            try:
+                self.reload()
+            except Exception:
+                pass  # already recorded and logged
+
+    def start(self):
+        if self.poll_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="heads-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> dict:
+        return {
+            "weights_hash": intent_heads.weights_hash(),
+            "model_version": intent_heads.model_version() if intent_heads.is_loaded() else None,
+            "weights_path": self.weights_path,
+            "poll_seconds": self.poll_seconds if self._thread is not None else 0,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_smoke": self.last_smoke,
+        }
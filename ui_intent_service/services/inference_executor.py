@@ -0,0 +1,123 @@
+import os
+import math
+import time
+import asyncio
+import functools
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import torch
+
+
+class Overloaded(Exception):
+    """Raised when a request is refused by admission control."""
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Bounded executor for CPU-bound inference with admission control.
+
+    - At most `max_concurrency` requests hold an inference slot at once.
+    - At most `max_queue` more may wait for a slot; beyond that requests are
+      rejected immediately with 429.
+    - A request that waits longer than `queue_timeout_ms` for a slot is
+      rejected with 503 instead of adding to tail latency.
+
+    Work that needs a thread runs on a small dedicated pool (`compute_workers`)
+    rather than Starlette's shared threadpool, and torch's intra-op thread count
+    is sized so that compute threads x intra-op threads matches the core count.
+    """
+    def __init__(self, max_concurrency: int = 16, max_queue: int = 64, queue_timeout_ms: float = 1000.0,
+                 compute_workers: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.compute_workers = max(1, compute_workers)
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self._service_time_ewma = 0.05
+
+        self._semaphore: asyncio.Semaphore | None = None
+        self._pool = ThreadPoolExecutor(max_workers=self.compute_workers, thread_name_prefix="inference")
+
+    def configure_torch_threads(self, other_compute_threads: int = 1) -> int:
+        """
+        Sets torch intra-op threads for this executor's pool plus any other
+        compute threads (e.g. the micro-batch scheduler). TORCH_NUM_THREADS overrides.
+        """
+        cpu_count = os.cpu_count() or 1
+        default = max(1, cpu_count // (self.compute_workers + other_compute_threads))
+        num_threads = int(os.getenv("TORCH_NUM_THREADS", str(default)))
+        torch.set_num_threads(num_threads)
+        return num_threads
+
+    def _retry_after(self) -> int:
+        # Rough time for the current backlog to drain through the slots
+        backlog = (self.waiting + self.in_flight) / self.max_concurrency
+        return max(1, math.ceil(backlog * self._service_time_ewma))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Admission-controlled inference slot."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self.in_flight + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected_queue_full += 1
+            raise Overloaded(429, "Inference queue is full.", self._retry_after())
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_deadline += 1
+            raise Overloaded(503, "Timed out waiting for an inference slot.", self._retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._service_time_ewma = 0.9 * self._service_time_ewma + 0.1 * (time.perf_counter() - start)
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) on the inference pool once a slot is granted."""
+        async with self.slot():
+            ctx = contextvars.copy_context()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(ctx.run, fn, *args))
+
+    async def run_scheduled(self, submit, item):
+        """
+        Admits a request whose work is done elsewhere (e.g. MicroBatchScheduler.submit)
+        and awaits its Future without tying up a thread.
+        """
+        async with self.slot():
+            future: Future = submit(item)
+            return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
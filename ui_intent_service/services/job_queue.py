@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+
+from services.inference_executor import Overloaded
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "data/cache/jobs.sqlite3")
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "data/cache/job_uploads")
+# Finished jobs (payload and result hold resume PII) are deleted this long after they finish
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+JOB_PURGE_INTERVAL_SECONDS = float(os.getenv("JOB_PURGE_INTERVAL_SECONDS", "300"))
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobStore:
+    """
+    SQLite-backed job table (WAL mode), shared by every worker process.
+
+    Jobs are claimed with a single conditional UPDATE, so two processes
+    polling the same file never run the same job twice.
+    """
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "progress REAL NOT NULL DEFAULT 0, stage TEXT, payload TEXT NOT NULL, "
+                "result TEXT, error TEXT, owner_pid INTEGER, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_updated ON jobs (status, updated_at)")
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor
+
+    def create(self, kind: str, payload: dict) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, stage, payload, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', 'queued', ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), now, now),
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit: int = 50, status: str | None = None) -> list:
+        sql = "SELECT * FROM jobs"
+        params = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._connection().execute(sql, params + (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim_next(self) -> dict | None:
+        """Atomically moves the oldest queued job to running for this process."""
+        with self._lock:
+            conn = self._connection()
+            while True:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'running', stage = 'starting', owner_pid = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ? AND status = 'queued'",
+                    (os.getpid(), time.time(), row["id"]),
+                )
+                conn.commit()
+                if cursor.rowcount == 1:
+                    break
+                # Another process claimed it first; try the next one
+        return self.get(row["id"])
+
+    def update_progress(self, job_id: str, progress: float, stage: str):
+        self._execute(
+            "UPDATE jobs SET progress = ?, stage = ?, updated_at = ? WHERE id = ?",
+            (progress, stage, time.time(), job_id),
+        )
+
+    def finish(self, job_id: str, result: dict | None = None, error: str | None = None):
+        status = "failed" if error is not None else "succeeded"
+        self._execute(
+            "UPDATE jobs SET status = ?, progress = 1.0, stage = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+        )
+
+    def purge_finished(self, older_than: float) -> int:
+        """Deletes succeeded/failed jobs whose last update is more than `older_than` seconds ago."""
+        cursor = self._execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            TERMINAL_STATUSES + (time.time() - older_than,),
+        )
+        return cursor.rowcount
+
+    def requeue_orphans(self) -> int:
+        """Requeues running jobs whose owning process is gone (crash or restart)."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id, owner_pid FROM jobs WHERE status = 'running'"
+            ).fetchall()
+        orphaned = [row["id"] for row in rows if not _pid_alive(row["owner_pid"])]
+        for job_id in orphaned:
+            self._execute(
+                "UPDATE jobs SET status = 'queued', stage = 'requeued', progress = 0, owner_pid = NULL, "
+                "updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+        return len(orphaned)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": round(row["progress"], 3),
+            "stage": row["stage"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "payload": json.loads(row["payload"]),
+        }
+
+
+def _pid_alive(pid: int | None) -> bool:
+    if not pid or pid == os.getpid():
+        # A running row owned by this very process at startup is left over from a previous life
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Background job runner on top of JobStore.
+
+    - submit() persists the job and returns immediately; a full queue raises
+      Overloaded (429) so callers get the same backpressure as inference.
+    - `workers` asyncio tasks claim jobs from the store and run the handler
+      registered for the job's kind: `async handler(payload, report)` where
+      `report(progress, stage)` records progress.
+    - Workers also poll the store, so jobs submitted by other processes (or
+      left queued by a previous run) are picked up too.
+    - A job interrupted more than max_attempts times is failed without running
+      its handler; the kind's `discard(payload)` hook then releases whatever
+      the payload points at (e.g. a spooled upload).
+    - Finished jobs older than `retention` seconds are purged from the worker
+      loop (every `purge_interval` seconds; retention <= 0 keeps them forever).
+    """
+    def __init__(self, store: JobStore, workers: int = 2, max_queued: int = 100,
+                 poll_interval: float = 1.0, max_attempts: int = 2,
+                 retention: float = JOB_RETENTION_SECONDS, purge_interval: float = JOB_PURGE_INTERVAL_SECONDS):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.handlers = {}
+        self.discards = {}
+        self._next_purge = 0.0
+        self._tasks = []
+        self._wakeup = None
+        self._changed = None
+
+    def register(self, kind: str, handler, discard=None):
+        self.handlers[kind] = handler
+        if discard is not None:
+            self.discards[kind] = discard
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Condition()
+        requeued = await asyncio.to_thread(self.store.requeue_orphans)
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s).")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs interrupted here stay 'running' with our pid and are requeued on next start
+        self.store.close()
+
+    async def submit(self, kind: str, payload: dict) -> dict:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if await asyncio.to_thread(self.store.count_queued) >= self.max_queued:
+            raise Overloaded(429, "Job queue is full", retry_after=5)
+        job = await asyncio.to_thread(self.store.create, kind, payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def _notify(self):
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _purge_if_due(self):
+        if self.retention <= 0 or time.monotonic() < self._next_purge:
+            return
+        # Set before awaiting so the other workers skip this round
+        self._next_purge = time.monotonic() + self.purge_interval
+        try:
+            purged = await asyncio.to_thread(self.store.purge_finished, self.retention)
+        except sqlite3.Error as e:
+            print(f"Job purge failed: {e}")
+            return
+        if purged:
+            print(f"Purged {purged} finished job(s) older than {self.retention:.0f}s.")
+
+    async def _worker(self):
+        while True:
+            await self._purge_if_due()
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._notify()
+            await self._run(job)
+
+    async def _run(self, job: dict):
+        job_id = job["job_id"]
+
+        async def report(progress: float, stage: str):
+            await asyncio.to_thread(self.store.update_progress, job_id, progress, stage)
+            await self._notify()
+
+        try:
+            if job["attempts"] > self.max_attempts:
+                # The handler never runs again, so it cannot clean up after itself
+                discard = self.discards.get(job["kind"])
+                if discard is not None:
+                    discard(job["payload"])
+                raise RuntimeError("Job was interrupted too many times.")
+            result = await self.handlers[job["kind"]](job["payload"], report)
+            await asyncio.to_thread(self.store.finish, job_id, result, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            await asyncio.to_thread(self.store.finish, job_id, None, str(e))
+        await self._notify()
+
+    async def wait_for_update(self, job_id: str, since: float, timeout: float) -> dict | None:
+        """
+        Long-poll helper: returns the job once updated_at moves past `since`,
+        it reaches a terminal status, or `timeout` elapses. Local updates wake
+        waiters immediately; updates from other processes are seen by polling.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            remaining = deadline - loop.time()
+            if job is None or job["updated_at"] > since or job["status"] in TERMINAL_STATUSES or remaining <= 0:
+                return job
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(self._changed.wait(), timeout=min(remaining, 0.5))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "max_queued": self.max_queued, "queued": self.store.count_queued()}
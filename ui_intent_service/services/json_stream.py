@@ -0,0 +1,87 @@
+import json
+
+
+class SectionStreamParser:
+    """
+    Incremental parser for a streamed top-level JSON object.
+
+    Feed it text chunks as they arrive from the LLM; each call returns the
+    (key, value) members whose value finished in that chunk. Only the
+    top-level structure is tracked (depth, strings, escapes), so every
+    character is scanned once and each member is decoded with json.loads
+    exactly once, when it closes.
+    """
+    def __init__(self):
+        self._buffer = []          # characters of the member currently being read
+        self._depth = 0            # 0 = before "{", 1 = inside the top-level object
+        self._in_string = False
+        self._escape = False
+        self._key = None           # decoded key awaiting its value
+        self._reading_value = False
+        self.done = False
+        self.sections = {}
+
+    def feed(self, chunk: str) -> list:
+        completed = []
+        for ch in chunk:
+            if self.done:
+                break
+
+            if self._in_string:
+                self._buffer.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._reading_value:
+                        # Closing quote of a top-level key
+                        self._key = json.loads("".join(self._buffer))
+                        self._buffer = []
+                continue
+
+            if self._depth == 0:
+                # Skip anything before the opening brace (whitespace, stray ```json fences)
+                if ch == "{":
+                    self._depth = 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._buffer.append(ch)
+            elif ch in "{[":
+                self._depth += 1
+                self._buffer.append(ch)
+            elif ch in "}]":
+                if self._depth == 1:
+                    # End of the top-level object; flush a trailing primitive value
+                    self._finish_member(completed)
+                    self.done = True
+                    break
+                self._depth -= 1
+                self._buffer.append(ch)
+                if self._depth == 1:
+                    self._finish_member(completed)
+            elif self._depth == 1:
+                if ch == ":":
+                    self._reading_value = True
+                elif ch == ",":
+                    self._finish_member(completed)
+                elif not ch.isspace() and self._reading_value:
+                    # Top-level primitive (number, true, false, null)
+                    self._buffer.append(ch)
+            else:
+                self._buffer.append(ch)
+        return completed
+
+    def _finish_member(self, completed: list):
+        if self._key is not None and self._reading_value:
+            raw = "".join(self._buffer).strip()
+            if raw:
+                value = json.loads(raw)
+                self.sections[self._key] = value
+                completed.append((self._key, value))
+        self._buffer = []
+        self._key = None
+        self._reading_value = False
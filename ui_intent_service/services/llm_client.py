@@ -1,14 +1,12 @@
 import os
 import json
-import urllib.request
-import asyncio
 
-async def generate_marketing_copy(prompt: str, layout_mode: str, sections: list) -> dict:
-    api_key = os.getenv("LLM_API_KEY")
-    if not api_key:
-        print("Warning: LLM_API_KEY not found. Returning empty dict.")
-        return {}
+from services.llm_transport import llm_transport
+from services.json_stream import SectionStreamParser
+from services import metrics
+from services.metrics import stage
 
+def build_copy_payload(prompt: str, layout_mode: str, sections: list) -> dict:
     sections_str = ", ".join(sections)
     system_prompt = f"""You are a marketing copy generator.
 
@@ -42,7 +40,7 @@ Required JSON Structure (Example for guidance):
 }}
 """
 
-    payload = {
+    return {
         "model": "gpt-4o-mini",
         "messages": [
             {"role": "system", "content": system_prompt}
@@ -52,24 +50,52 @@ Required JSON Structure (Example for guidance):
         "response_format": {"type": "json_object"}
     }
 
-    req = urllib.request.Request(
-        "https://api.openai.com/v1/chat/completions",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        },
-        method="POST"
-    )
-
-    def fetch_api():
-        try:
-            with urllib.request.urlopen(req, timeout=7.5) as response:
-                result = json.loads(response.read().decode("utf-8"))
-                content = result["choices"][0]["message"]["content"]
-                return json.loads(content)
-        except Exception as e:
-            print(f"LLM API Error: {e}")
-            return {}
-
-    return await asyncio.to_thread(fetch_api)
+async def generate_marketing_copy(prompt: str, layout_mode: str, sections: list) -> dict:
+    api_key = os.getenv("LLM_API_KEY")
+    if not api_key:
+        print("Warning: LLM_API_KEY not found. Returning empty dict.")
+        return {}
+
+    payload = build_copy_payload(prompt, layout_mode, sections)
+
+    try:
+        with stage("llm_copy"):
+            content = await llm_transport.chat_completion_content(payload, api_key, timeout=7.5)
+        return json.loads(content)
+    except Exception as e:
+        metrics.LLM_ERRORS.inc("copy", type(e).__name__)
+        print(f"LLM API Error: {e}")
+        return {}
+
+class CopyStreamIncomplete(Exception):
+    """The copy stream ended before the top-level JSON object closed (error, disconnect or truncation)."""
+
+
+async def stream_marketing_copy(prompt: str, layout_mode: str, sections: list):
+    """
+    Yields (section_name, copy) as soon as each top-level section of the LLM's
+    JSON is complete. The caller owns the deadline. The generator only finishes
+    normally once the whole object has been parsed; a transport error or a
+    stream that stops early (e.g. max_tokens) raises CopyStreamIncomplete after
+    the sections already yielded.
+    """
+    api_key = os.getenv("LLM_API_KEY")
+    if not api_key:
+        raise CopyStreamIncomplete("LLM_API_KEY not found")
+
+    payload = build_copy_payload(prompt, layout_mode, sections)
+    parser = SectionStreamParser()
+
+    try:
+        async for delta in llm_transport.stream_chat_completion_content(payload, api_key, timeout=30.0):
+            for section in parser.feed(delta):
+                yield section
+            if parser.done:
+                break
+    except Exception as e:
+        metrics.LLM_ERRORS.inc("copy_stream", type(e).__name__)
+        raise CopyStreamIncomplete(f"LLM stream error: {e}") from e
+
+    if not parser.done:
+        metrics.LLM_ERRORS.inc("copy_stream", "truncated")
+        raise CopyStreamIncomplete("LLM stream ended before the JSON object was complete")
@@ -0,0 +1,83 @@
+import os
+import json
+import httpx
+
+# Point at a local stand-in (e.g. a stub chat-completions server) by overriding this
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+
+
+class LLMTransport:
+    """
+    Shared async client for the chat-completions API.
+
+    One pooled httpx.AsyncClient is reused by every caller, so requests share
+    keep-alive connections instead of paying a TCP + TLS handshake each time,
+    and no threadpool slot is held while waiting on the network.
+    """
+    def __init__(self, base_url: str = LLM_BASE_URL, max_connections: int = 32,
+                 max_keepalive_connections: int = 16, keepalive_expiry: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits)
+        return self._client
+
+    async def chat_completion(self, payload: dict, api_key: str, timeout: float) -> dict:
+        """POSTs /chat/completions and returns the decoded JSON response (raises on HTTP errors)."""
+        response = await self.client.post(
+            "/chat/completions",
+            json=payload,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def chat_completion_content(self, payload: dict, api_key: str, timeout: float) -> str:
+        """Like chat_completion, but returns only the first choice's message content."""
+        result = await self.chat_completion(payload, api_key, timeout)
+        return result["choices"][0]["message"]["content"]
+
+    async def stream_chat_completion_content(self, payload: dict, api_key: str, timeout: float):
+        """
+        Streams the first choice's content deltas as they arrive (payload is sent
+        with "stream": true and the server-sent "data:" lines are decoded here).
+        """
+        async with self.client.stream(
+            "POST",
+            "/chat/completions",
+            json={**payload, "stream": True},
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                if choices:
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+llm_transport = LLMTransport(
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "32")),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "16")),
+)
@@ -0,0 +1,122 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "2"))
+SPOOL_CHUNK_BYTES = 64 * 1024
+
+
+class UploadRejected(Exception):
+    """Raised when an upload breaks a size/format limit; the message is user-facing."""
+
+
+async def spool_upload(file, max_bytes: int | None = None, directory: str | None = None) -> tuple:
+    """
+    Copies an UploadFile to a temp .pdf on disk in fixed-size chunks, so the
+    whole upload is never held in memory. Returns (path, sha256 of the bytes);
+    the caller deletes the file. `directory` defaults to the system temp dir.
+    """
+    max_bytes = max_bytes or UPLOAD_MAX_BYTES
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="upload-", dir=directory)
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if written == 0 and not chunk.startswith(b"%PDF"):
+                    raise UploadRejected("File is not a valid PDF.")
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadRejected(f"File exceeds the {max_bytes / (1024 * 1024):.1f} MB upload limit.")
+                digest.update(chunk)
+                out.write(chunk)
+        if written == 0:
+            raise UploadRejected("Empty file uploaded.")
+        return path, digest.hexdigest()
+    except BaseException:
+        os.unlink(path)
+        raise
+
+
+# --- Worker-side functions (run inside the process pool) ---
+
+def _page_count(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pages(path: str, start: int, stop: int) -> list:
+    texts = []
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[start:stop]:
+            texts.append(page.extract_text() or "")
+            # Free pdfminer's layout objects before the next page
+            page.flush_cache()
+    return texts
+
+
+# --- Event-loop side ---
+
+_pool = None
+
+def get_pool() -> ProcessPoolExecutor:
+    """Lazily starts the extraction pool. Spawned (not forked) so workers never inherit torch threads."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def pdf_page_count(path: str) -> int:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), _page_count, path)
+
+
+async def extract_pdf_pages(path: str, max_pages: int | None = None, total: int | None = None,
+                            pages_per_task: int = PDF_PAGES_PER_TASK):
+    """
+    Yields page text in page order while page ranges are extracted in parallel
+    by the process pool. Only the first max_pages pages are read (all of them
+    when None); `total` skips recounting when the caller already has the page
+    count. If the caller stops iterating early, the remaining ranges are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+
+    if total is None:
+        total = await pdf_page_count(path)
+    n_pages = total if max_pages is None else min(total, max_pages)
+
+    futures = [
+        loop.run_in_executor(pool, _extract_pages, path, start, min(start + pages_per_task, n_pages))
+        for start in range(0, n_pages, pages_per_task)
+    ]
+    try:
+        for future in futures:
+            for text in await future:
+                yield text
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,78 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from models.embedding_cache import normalize_prompt
+
+
+class PlanCache:
+    """
+    Bounded LRU of serialized /plan responses for requests with an explicit seed.
+
+    A seeded plan is fully determined by (normalized prompt, seed, model
+    version, planner version), so the key doubles as a strong ETag: clients
+    can revalidate with If-None-Match without the server recomputing anything.
+    """
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag_for(prompt: str, seed: int, model_version: str, planner_version: str) -> str:
+        ident = f"{normalize_prompt(prompt)}\x00{seed}\x00{model_version}\x00{planner_version}"
+        return '"' + hashlib.sha256(ident.encode("utf-8")).hexdigest()[:32] + '"'
+
+    @staticmethod
+    def matches(if_none_match: str | None, etag: str) -> bool:
+        """True if an If-None-Match header value matches etag (weak comparison, '*' allowed)."""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*" or candidate.removeprefix("W/") == etag:
+                return True
+        return False
+
+    def get(self, etag: str) -> bytes | None:
+        with self._lock:
+            body = self._data.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[etag] = body
+            self._data.move_to_end(etag)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate(self):
+        """Drops every entry (e.g. after the model weights change)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,183 @@
+import json
+import typing
+
+from pydantic import BaseModel, ValidationError
+
+from models.portfolio_schema import PortfolioSchema
+
+MAX_REPAIR_ROUNDS = 20
+
+
+def close_truncated_json(text: str) -> str:
+    """
+    Best-effort completion of JSON cut off mid-stream (e.g. max_tokens hit):
+    drops the dangling partial token and closes any open string/array/object.
+    """
+    stack = []
+    in_string = False
+    escape = False
+    last_safe = 0  # index just past the last complete value/container boundary
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            last_safe = i + 1
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            last_safe = i + 1
+        elif ch == ",":
+            last_safe = i
+
+    if not stack:
+        return text
+    # Cut back to the last boundary so a half-written key/value is dropped
+    return text[:last_safe].rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def _container_at(data, loc: tuple):
+    node = data
+    for part in loc:
+        node = node[part]
+    return node
+
+
+def _model_in(annotation):
+    """The BaseModel class inside Optional[...] / List[...], or None."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _model_in(arg)
+        if model is not None:
+            return model
+    return None
+
+
+def _missing_fill(schema, loc: tuple):
+    """
+    Empty value of the right type for a missing field: {} for a submodel (its own
+    required fields are filled on the next round), [] for a list, "" otherwise.
+    """
+    model = schema
+    for part in loc[:-1]:
+        if isinstance(part, int):
+            continue
+        field = model.model_fields.get(part) if model is not None else None
+        model = _model_in(field.annotation) if field is not None else None
+    field = model.model_fields.get(loc[-1]) if model is not None else None
+    if field is None:
+        return ""
+    annotation = field.annotation
+    # List[...] or Optional[List[...]]
+    if any(typing.get_origin(a) is list for a in (annotation, *typing.get_args(annotation))):
+        return []
+    if _model_in(annotation) is not None:
+        return {}
+    return ""
+
+
+def _coerce_string(value):
+    if value is None:
+        return ""
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value if v is not None)
+    return None
+
+
+def _fix(data: dict, error: dict, schema=PortfolioSchema):
+    """
+    Applies one local fix for a pydantic error. Returns "fixed", "deleted"
+    (a list entry was removed, so later error locations may be stale) or None.
+    """
+    loc = error["loc"]
+    if not loc:
+        return None
+    parent_loc, key = loc[:-1], loc[-1]
+    try:
+        parent = _container_at(data, parent_loc)
+    except (KeyError, IndexError, TypeError):
+        return None
+
+    # Nearest enclosing list item, so a broken entry can be dropped as a whole
+    list_index = max((i for i, part in enumerate(loc) if isinstance(part, int)), default=None)
+
+    kind = error["type"]
+    value = parent.get(key) if isinstance(parent, dict) else None
+
+    if kind == "missing" and isinstance(parent, dict):
+        owner = _container_at(data, loc[:list_index]) if list_index is not None else None
+        # The last entry of an array missing fields is where truncation cut off; drop it below.
+        # Anywhere else, a missing required field is filled with an empty value of its type.
+        if owner is None or loc[list_index] != len(owner) - 1:
+            parent[key] = _missing_fill(schema, loc)
+            return "fixed"
+    elif kind == "string_type" and isinstance(parent, (dict, list)):
+        coerced = _coerce_string(parent[key])
+        if coerced is not None:
+            parent[key] = coerced
+            return "fixed"
+    elif kind == "list_type" and isinstance(parent, dict):
+        parent[key] = [] if value is None else [value]
+        return "fixed"
+
+    if list_index is not None:
+        del _container_at(data, loc[:list_index])[loc[list_index]]
+        return "deleted"
+    if isinstance(parent, dict) and key in parent and parent is not data:
+        # Nested optional value of the wrong shape: let its default apply
+        del parent[key]
+        return "fixed"
+    return None
+
+
+def decode_portfolio(content: str, schema=PortfolioSchema) -> dict:
+    """
+    Fast path: one pydantic pass that parses and validates the raw JSON
+    against `schema` (PortfolioSchema unless given).
+
+    On failure, a local repair pass runs. It closes truncated JSON, fills
+    missing required strings, coerces scalar/list type mix-ups and drops
+    broken array entries. Returns the validated portfolio as plain JSON-ready
+    data, or raises ValueError if the output cannot be repaired.
+    """
+    try:
+        return schema.model_validate_json(content).model_dump(mode="json")
+    except ValidationError:
+        pass
+
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(close_truncated_json(content))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"LLM output is not valid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("LLM output is not a JSON object.")
+
+    for _ in range(MAX_REPAIR_ROUNDS):
+        try:
+            return schema.model_validate(data).model_dump(mode="json")
+        except ValidationError as e:
+            errors = e.errors()
+        fixed = False
+        for error in errors:
+            outcome = _fix(data, error, schema)
+            fixed = fixed or outcome is not None
+            if outcome == "deleted":
+                # Indices after the removed entry moved; revalidate before fixing more
+                break
+        if not fixed:
+            break
+    raise ValueError(f"LLM output does not match the portfolio schema ({len(errors)} errors).")
@@ -0,0 +1,160 @@
+"""
+Request-level diagnostics: a Server-Timing middleware and an on-demand
+sampling profiler.
+
+Server-Timing carries the stage timings recorded by services.metrics.stage
+for the current request, so the breakdown shows up in the browser's
+devtools (Network -> Timing) next to the request itself.
+
+The profiler is pure Python and needs no extra packages. A background thread
+snapshots every thread's stack via sys._current_frames() at a fixed
+interval and counts collapsed stacks ("frame;frame;frame count"). That
+format is read directly by flamegraph.pl, speedscope and inferno. Nothing
+runs unless a profile has been requested.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+from services import metrics
+
+# Stage name -> Server-Timing metric name (stages sharing a name are summed)
+SERVER_TIMING_NAMES = {
+    "intent_request": "intent",
+    "encode": "encode",
+    "intent_heads": "forward",
+    "plan_keywords": "plan",
+    "plan_generate": "plan",
+    "plan_overrides": "plan",
+    "pdf_extract": "pdf",
+    "cleanse": "cleanse",
+    "llm_copy": "llm",
+    "llm_resume": "llm",
+    "resume_decode": "decode",
+}
+
+
+def server_timing_header(timings: list, total_seconds: float) -> str:
+    totals = {}
+    for name, seconds in timings:
+        key = SERVER_TIMING_NAMES.get(name, name)
+        totals[key] = totals.get(key, 0.0) + seconds
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items()]
+    parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware buffering) that collects the
+    request's stage timings and adds Server-Timing to the response headers.
+    For streamed responses the headers leave first, so only stages finished
+    before the first byte are included.
+    """
+    def __init__(self, app, request_counter=None):
+        self.app = app
+        self.request_counter = request_counter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings, token = metrics.begin_request_timings()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = server_timing_header(timings, time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", header.encode("latin-1")))
+                # Lets cross-origin frontends (e.g. the Vite dev server) see the timings
+                headers.append((b"timing-allow-origin", b"*"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.end_request_timings(token)
+            if self.request_counter is not None:
+                self.request_counter.increment()
+
+
+class RequestCounter:
+    """Monotonic count of finished HTTP requests (used to stop a profile after N requests)."""
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        with self._lock:
+            self.value += 1
+
+
+# Leaf frames in these files mean the thread is parked, not working
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "base_events.py", "thread.py")
+
+
+def _frame_label(frame) -> str:
+    # Function identity (definition line), not the current line, so samples aggregate per function
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock stack sampler for a live process. One profile at a time;
+    start() raises RuntimeError if one is already running.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float, include_idle: bool = False):
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profile is already running.")
+            self.stacks = Counter()
+            self.samples = 0
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample_loop, args=(interval, include_idle), name="sampling-profiler", daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample_loop(self, interval: float, include_idle: bool):
+        own_id = threading.get_ident()
+        while not self._stop.wait(interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if not include_idle and os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(f"thread:{names.get(thread_id, thread_id)}")
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text, heaviest first: `root;...;leaf count` per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Empty string disables the cache. Lives next to the dataset embedding cache (gitignored).
+RESUME_CACHE_PATH = os.getenv("RESUME_CACHE_PATH", "data/cache/resume_cache.sqlite3")
+# Entries hold resume text, so they expire; 0 keeps them until evicted by the row cap
+RESUME_CACHE_TTL_SECONDS = float(os.getenv("RESUME_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Per table; least recently used rows are evicted past this
+RESUME_CACHE_MAX_ROWS = int(os.getenv("RESUME_CACHE_MAX_ROWS", "5000"))
+
+TABLES = ("pdf_text", "portfolio")
+
+
+def sha256_text(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResumeCache:
+    """
+    Content-addressed, on-disk cache for the resume pipeline (SQLite, WAL mode).
+
+    Two levels:
+      1. pdf_text:  sha256(raw PDF bytes)              -> cleansed text + extraction info
+      2. portfolio: sha256(cleansed text, prompt version) -> validated portfolio JSON
+
+    Rows older than ttl_seconds are misses and are deleted on the next put;
+    each table is capped at max_rows, evicting the least recently used.
+
+    The connection is opened lazily in the process that first uses it, so
+    pre-forked workers each get their own handle on the shared file.
+    """
+    def __init__(self, path: str = RESUME_CACHE_PATH, ttl_seconds: float = RESUME_CACHE_TTL_SECONDS,
+                 max_rows: int = RESUME_CACHE_MAX_ROWS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.hits = {"pdf_text": 0, "portfolio": 0}
+        self.misses = {"pdf_text": 0, "portfolio": 0}
+        self.evictions = {"pdf_text": 0, "portfolio": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pdf_text ("
+                "sha256 TEXT PRIMARY KEY, text TEXT NOT NULL, extraction TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS portfolio ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            for table in TABLES:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created ON {table} (created_at)")
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def _get(self, table: str, columns: str, key_column: str, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                f"SELECT {columns} FROM {table} WHERE {key_column} = ? AND created_at >= ?",
+                (key, self._expired_before()),
+            ).fetchone()
+            if row is not None:
+                conn.execute(f"UPDATE {table} SET last_used = ? WHERE {key_column} = ?", (time.time(), key))
+                conn.commit()
+        if row is None:
+            self.misses[table] += 1
+        else:
+            self.hits[table] += 1
+        return row
+
+    def _put(self, table: str, sql: str, params: tuple):
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(sql, params)
+            evicted = conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (self._expired_before(),)).rowcount
+            if self.max_rows > 0:
+                evicted += conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} "
+                    f"ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                ).rowcount
+            conn.commit()
+        self.evictions[table] += evicted
+
+    def get_text(self, pdf_sha256: str):
+        """Returns (clean_text, extraction) or None; extraction is the dict extract_resume_text returned."""
+        row = self._get("pdf_text", "text, extraction", "sha256", pdf_sha256)
+        return (row[0], json.loads(row[1])) if row else None
+
+    def put_text(self, pdf_sha256: str, text: str, extraction: dict):
+        now = time.time()
+        self._put(
+            "pdf_text",
+            "INSERT OR REPLACE INTO pdf_text (sha256, text, extraction, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (pdf_sha256, text, json.dumps(extraction), now, now),
+        )
+
+    def get_portfolio(self, key: str):
+        row = self._get("portfolio", "data", "key", key)
+        return json.loads(row[0]) if row else None
+
+    def put_portfolio(self, key: str, data: dict):
+        now = time.time()
+        self._put(
+            "portfolio",
+            "INSERT OR REPLACE INTO portfolio (key, data, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(data), now, now),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled, "path": self.path,
+            "ttl_seconds": self.ttl_seconds, "max_rows": self.max_rows,
+            "hits": dict(self.hits), "misses": dict(self.misses), "evictions": dict(self.evictions),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+resume_cache = ResumeCache()
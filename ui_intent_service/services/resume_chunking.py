@@ -0,0 +1,166 @@
+import re
+
+# Headings that start a new resume section (matched on a line of their own)
+SECTION_HEADINGS = (
+    "summary", "profile", "about", "objective",
+    "experience", "work experience", "professional experience", "employment", "work history",
+    "projects", "selected projects", "personal projects", "research", "research experience",
+    "publications", "education", "skills", "technical skills", "certifications",
+    "awards", "honors", "teaching", "talks", "volunteering", "leadership", "activities",
+)
+
+MAX_PROJECTS = 5
+MAX_SKILL_CATEGORIES = 5
+MAX_TECH_ITEMS = 5
+
+
+def _is_heading(line: str) -> bool:
+    # A known heading in any case, or a short ALL-CAPS line
+    stripped = line.strip().rstrip(":").strip()
+    if not stripped or len(stripped) > 40:
+        return False
+    if stripped.lower() in SECTION_HEADINGS:
+        return True
+    return stripped.isupper() and bool(re.fullmatch(r"[A-Z][A-Z &/]{2,40}", stripped))
+
+
+def split_sections(text: str) -> list:
+    """Splits cleaned resume text at heading lines. The header block before the first heading stays first."""
+    sections, current = [], []
+    for line in text.split("\n"):
+        if _is_heading(line) and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return [s for s in sections if s.strip()]
+
+
+def _split_oversized(section: str, max_chars: int) -> list:
+    # Paragraphs first, then lines, then a hard cut as the last resort
+    pieces, current = [], ""
+    for unit in re.split(r"(\n\n|\n)", section):
+        if len(current) + len(unit) > max_chars and current:
+            pieces.append(current)
+            current = ""
+        while len(unit) > max_chars:
+            pieces.append(unit[:max_chars])
+            unit = unit[max_chars:]
+        current += unit
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+
+def chunk_resume(text: str, max_chars: int) -> list:
+    """
+    Packs whole sections greedily into chunks of at most max_chars. A section
+    is only split when it is larger than a chunk on its own.
+    """
+    chunks, current = [], ""
+    for section in split_sections(text):
+        for piece in ([section] if len(section) <= max_chars else _split_oversized(section, max_chars)):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _norm(value) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(value or "").lower()).strip()
+
+
+def _impact_score(project: dict) -> int:
+    impact = project.get("impact") or ""
+    return (2 if re.search(r"\d", impact) else 1 if impact else 0) + (1 if project.get("link") else 0)
+
+
+def _dedupe(items: list, key) -> list:
+    """First occurrence wins, but empty fields are filled from later duplicates."""
+    merged, order = {}, []
+    for item in items:
+        k = key(item)
+        if not k:
+            continue
+        if k not in merged:
+            merged[k] = dict(item)
+            order.append(k)
+        else:
+            for field, value in item.items():
+                if value and not merged[k].get(field):
+                    merged[k][field] = value
+    return [merged[k] for k in order]
+
+
+def _unique(values: list, limit: int | None = None) -> list:
+    seen, out = set(), []
+    for value in values:
+        k = _norm(value)
+        if k and k not in seen:
+            seen.add(k)
+            out.append(value)
+    return out[:limit] if limit else out
+
+
+def merge_portfolios(parts: list) -> dict:
+    """
+    Deterministically merges per-chunk portfolio dicts (in chunk order):
+    personal/about come from the first chunk that has them, projects are
+    deduped by title, ranked by impact (stable, so ties keep resume order) and
+    trimmed to 5, experience/education are deduped in order and skills are
+    merged per category (max 5 categories, tech lists max 5).
+    """
+    personal, about = {}, ""
+    socials = {}
+    projects, experience, education, skills = [], [], [], {}
+    skill_order = []
+
+    for part in parts:
+        p = part.get("personal") or {}
+        for field in ("name", "headline", "location"):
+            if p.get(field) and not personal.get(field):
+                personal[field] = p[field]
+        for field, value in (p.get("social_links") or {}).items():
+            if value and not socials.get(field):
+                socials[field] = value
+        if part.get("about") and not about:
+            about = part["about"]
+        projects.extend(part.get("featured_projects") or [])
+        experience.extend(part.get("experience") or [])
+        education.extend(part.get("education") or [])
+        for group in part.get("skills") or []:
+            category = _norm(group.get("category"))
+            if not category:
+                continue
+            if category not in skills:
+                skills[category] = {"category": group["category"], "items": []}
+                skill_order.append(category)
+            skills[category]["items"].extend(group.get("items") or [])
+
+    projects = _dedupe(projects, lambda pr: _norm(pr.get("title")))
+    projects.sort(key=_impact_score, reverse=True)
+    for project in projects:
+        project["tech_stack"] = _unique(project.get("tech_stack") or [], MAX_TECH_ITEMS)
+
+    experience = _dedupe(experience, lambda e: (_norm(e.get("role")), _norm(e.get("company"))) if e.get("role") else None)
+    for entry in experience:
+        entry["tech"] = _unique(entry.get("tech") or [], MAX_TECH_ITEMS)
+
+    personal.setdefault("name", "")
+    personal.setdefault("headline", "")
+
+    return {
+        "personal": {**personal, "social_links": socials},
+        "about": about,
+        "featured_projects": projects[:MAX_PROJECTS],
+        "experience": experience,
+        "education": _dedupe(education, lambda e: (_norm(e.get("institution")), _norm(e.get("degree")))),
+        "skills": [
+            {"category": skills[c]["category"], "items": _unique(skills[c]["items"])}
+            for c in skill_order[:MAX_SKILL_CATEGORIES]
+        ],
+    }
@@ -1,14 +1,32 @@
 import os
 import json
 import re
-import urllib.request
-import asyncio
 import pdfplumber
 import io
-from models.portfolio_schema import PortfolioSchema
+import asyncio
+from models.portfolio_schema import PortfolioSchema, PortfolioChunkSchema
+from services.llm_transport import llm_transport
+from services.resume_cache import resume_cache, sha256_text
+from services.pdf_extract import extract_pdf_pages, pdf_page_count
+from services.portfolio_repair import decode_portfolio
+from services.resume_chunking import chunk_resume, merge_portfolios
+from services import metrics
+from services.metrics import stage
 
 
-MAX_RESUME_CHARS = 15000  # Safety cap for LLM context
+MAX_RESUME_CHARS = 15000  # Safety cap for LLM context (single-call mode)
+
+# Chunked mode: long resumes are split on section boundaries and extracted
+# chunk-by-chunk concurrently, then merged, instead of being truncated.
+RESUME_CHUNKING = os.getenv("RESUME_CHUNKING", "1") == "1"
+RESUME_CHUNK_CHARS = int(os.getenv("RESUME_CHUNK_CHARS", "6000"))
+RESUME_CHUNKED_MAX_CHARS = int(os.getenv("RESUME_CHUNKED_MAX_CHARS", "60000"))
+RESUME_CHUNK_CONCURRENCY = int(os.getenv("RESUME_CHUNK_CONCURRENCY", "4"))
+RESUME_TEXT_MAX_CHARS = RESUME_CHUNKED_MAX_CHARS if RESUME_CHUNKING else MAX_RESUME_CHARS
+# Extraction already stops once RESUME_TEXT_MAX_CHARS of text is read, so the page
+# cap only guards against near-empty pages: enough pages to fill the text budget
+# at ~1000 characters a page (a dense resume page has about three times that)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", str(max(20, RESUME_TEXT_MAX_CHARS // 1000))))
 
 
 def extract_text_from_pdf(file_bytes: bytes) -> str:
@@ -22,22 +40,63 @@ def extract_text_from_pdf(file_bytes: bytes) -> str:
     return "\n".join(text_parts)
 
 
-def cleanse_text(raw: str) -> str:
-    """
-    Clean and normalize resume text before sending to LLM.
-    Prevents token-limit issues and garbage input.
-    """
+def _normalize_text(raw: str) -> str:
     # Collapse multiple whitespace/newlines
     text = re.sub(r'\n{3,}', '\n\n', raw)
     text = re.sub(r'[ \t]{2,}', ' ', text)
     # Strip non-printable characters
-    text = re.sub(r'[^\x20-\x7E\n\r\t]', '', text)
+    return re.sub(r'[^\x20-\x7E\n\r\t]', '', text)
+
+
+def cleanse_text(raw: str, max_chars: int = MAX_RESUME_CHARS) -> str:
+    """
+    Clean and normalize resume text before sending to LLM.
+    Prevents token-limit issues and garbage input.
+    """
+    text = _normalize_text(raw)
     # Truncate to safe limit
-    if len(text) > MAX_RESUME_CHARS:
-        text = text[:MAX_RESUME_CHARS] + "\n\n[TRUNCATED — remaining content omitted]"
+    if len(text) > max_chars:
+        text = text[:max_chars] + "\n\n[TRUNCATED — remaining content omitted]"
     return text.strip()
 
 
+async def extract_resume_text(path: str, max_chars: int = RESUME_TEXT_MAX_CHARS,
+                              max_pages: int = PDF_MAX_PAGES) -> tuple:
+    """
+    Streams pages from the parallel extractor through the cleanser and stops
+    as soon as enough clean text exists to fill max_chars, so later pages are
+    never parsed. Returns (clean_text, extraction) where extraction holds
+    raw_chars, pages_total, pages_extracted and truncated (pages skipped by
+    the page cap or text cut at max_chars).
+    """
+    parts = []
+    raw_chars = 0
+    clean_chars = 0
+    pages_extracted = 0
+    total = await pdf_page_count(path)
+    if total > max_pages:
+        print(f"PDF has {total} pages; extracting at most the first {max_pages}.")
+    async for page_text in extract_pdf_pages(path, max_pages=max_pages, total=total):
+        pages_extracted += 1
+        if not page_text:
+            continue
+        raw_chars += len(page_text)
+        page_clean = _normalize_text(page_text)
+        parts.append(page_clean)
+        clean_chars += len(page_clean) + 1
+        if clean_chars > max_chars:
+            break
+    joined = "\n".join(parts)
+    extraction = {
+        "raw_chars": raw_chars,
+        "pages_total": total,
+        "pages_extracted": pages_extracted,
+        # Same test cleanse_text uses to cut the text
+        "truncated": pages_extracted < total or len(_normalize_text(joined)) > max_chars,
+    }
+    return cleanse_text(joined, max_chars), extraction
+
+
 TRANSFORMATION_PROMPT = """You are a Portfolio Compiler — an editorial engine that transforms raw resume text into curated portfolio data.
 
 ## YOUR JOB
@@ -89,6 +148,97 @@ No markdown, no commentary, no extra text.
 """
 
 
+RESUME_LLM_MODEL = "gpt-4o-mini"
+RESUME_LLM_TEMPERATURE = 0.3
+# Extra LLM calls allowed when the output cannot be repaired locally
+RESUME_LLM_RETRIES = int(os.getenv("RESUME_LLM_RETRIES", "1"))
+
+
+def _compact_schema(node, in_properties: bool = False):
+    # Drop pydantic's auto-generated "title" keywords (pure token overhead);
+    # inside "properties" the keys are field names, so a field called "title" stays.
+    if isinstance(node, dict):
+        return {
+            k: _compact_schema(v, k == "properties")
+            for k, v in node.items()
+            if in_properties or k != "title"
+        }
+    if isinstance(node, list):
+        return [_compact_schema(v) for v in node]
+    return node
+
+
+# Built once at import: compact schema (no indentation, no titles) inside the prompt
+SCHEMA_JSON = json.dumps(_compact_schema(PortfolioSchema.model_json_schema()), separators=(",", ":"))
+SYSTEM_PROMPT = TRANSFORMATION_PROMPT.format(schema=SCHEMA_JSON)
+
+# Anything that changes the LLM's output changes this, so stale cached portfolios are never served
+RESUME_PROMPT_VERSION = sha256_text(
+    SYSTEM_PROMPT, RESUME_LLM_MODEL, str(RESUME_LLM_TEMPERATURE),
+    f"chunked={RESUME_CHUNKING}:{RESUME_CHUNK_CHARS}",
+)[:16]
+
+_chunk_semaphore = None
+
+
+async def _transform(user_content: str, api_key: str, schema=PortfolioSchema) -> tuple:
+    """One LLM extraction call (with repair/retry), validated against `schema`. Returns (portfolio, error)."""
+    payload = {
+        "model": RESUME_LLM_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content}
+        ],
+        "temperature": RESUME_LLM_TEMPERATURE,
+        "max_tokens": 4096,
+        "response_format": {"type": "json_object"}
+    }
+
+    error = None
+    for attempt in range(RESUME_LLM_RETRIES + 1):
+        try:
+            with stage("llm_resume"):
+                content = await llm_transport.chat_completion_content(payload, api_key, timeout=30.0)
+        except Exception as e:
+            metrics.LLM_ERRORS.inc("resume", type(e).__name__)
+            print(f"LLM API Error during resume transformation: {e}")
+            return None, str(e)
+        try:
+            # Validated (and locally repaired if needed) against the schema
+            with stage("resume_decode"):
+                return decode_portfolio(content, schema), None
+        except ValueError as e:
+            metrics.LLM_ERRORS.inc("resume", "invalid_output")
+            print(f"Resume transformation attempt {attempt + 1} unusable: {e}")
+            error = str(e)
+    return None, error
+
+
+async def _transform_chunked(chunks: list, api_key: str) -> tuple:
+    """Map: one extraction per chunk, at most RESUME_CHUNK_CONCURRENCY in flight. Reduce: merge_portfolios."""
+    global _chunk_semaphore
+    if _chunk_semaphore is None:
+        _chunk_semaphore = asyncio.Semaphore(RESUME_CHUNK_CONCURRENCY)
+
+    async def run(i: int, chunk: str):
+        async with _chunk_semaphore:
+            return await _transform(
+                f"Transform this resume excerpt (part {i + 1} of {len(chunks)}) into portfolio data. "
+                f"Use only what appears in this excerpt; leave fields empty when it does not contain them:\n\n{chunk}",
+                api_key,
+                # Excerpts may lack personal/about; only the merged result must be complete
+                schema=PortfolioChunkSchema,
+            )
+
+    results = await asyncio.gather(*(run(i, chunk) for i, chunk in enumerate(chunks)))
+    parts = [portfolio for portfolio, _ in results if portfolio is not None]
+    if not parts:
+        return None, results[0][1]
+    if len(parts) < len(chunks):
+        print(f"Resume transformation: {len(chunks) - len(parts)} of {len(chunks)} chunks failed; merging the rest.")
+    return PortfolioSchema.model_validate(merge_portfolios(parts)).model_dump(mode="json"), None
+
+
 async def parse_resume_to_portfolio(resume_text: str) -> dict:
     """
     Transforms raw resume text into curated portfolio JSON via LLM.
@@ -99,43 +249,25 @@ async def parse_resume_to_portfolio(resume_text: str) -> dict:
         return {}
 
     # Cleanse the text
-    clean_text = cleanse_text(resume_text)
+    with stage("cleanse"):
+        clean_text = cleanse_text(resume_text, RESUME_TEXT_MAX_CHARS)
     if len(clean_text) < 30:
         return {"error": "Not enough text extracted from the resume."}
 
-    # Get schema for the prompt
-    schema_json = json.dumps(PortfolioSchema.model_json_schema(), indent=2)
-    system_prompt = TRANSFORMATION_PROMPT.format(schema=schema_json)
+    cache_key = sha256_text(clean_text, RESUME_PROMPT_VERSION)
+    cached = await asyncio.to_thread(resume_cache.get_portfolio, cache_key)
+    if cached is not None:
+        return cached
 
-    payload = {
-        "model": "gpt-4o-mini",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Transform this resume into portfolio data:\n\n{clean_text}"}
-        ],
-        "temperature": 0.3,
-        "max_tokens": 4096,
-        "response_format": {"type": "json_object"}
-    }
-
-    req = urllib.request.Request(
-        "https://api.openai.com/v1/chat/completions",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        },
-        method="POST"
-    )
-
-    def fetch_api():
-        try:
-            with urllib.request.urlopen(req, timeout=30.0) as response:
-                result = json.loads(response.read().decode("utf-8"))
-                content = result["choices"][0]["message"]["content"]
-                return json.loads(content)
-        except Exception as e:
-            print(f"LLM API Error during resume transformation: {e}")
-            return {"error": str(e)}
+    if RESUME_CHUNKING and len(clean_text) > RESUME_CHUNK_CHARS:
+        portfolio, error = await _transform_chunked(chunk_resume(clean_text, RESUME_CHUNK_CHARS), api_key)
+    else:
+        portfolio, error = await _transform(f"Transform this resume into portfolio data:\n\n{clean_text}", api_key)
+    if portfolio is None:
+        return {"error": error}
 
-    return await asyncio.to_thread(fetch_api)
+    try:
+        await asyncio.to_thread(resume_cache.put_portfolio, cache_key, portfolio)
+    except Exception as e:
+        print(f"Resume cache write failed: {e}")
+    return portfolio
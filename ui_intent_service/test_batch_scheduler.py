@@ -0,0 +1,140 @@
+import time
+import threading
+from concurrent.futures import CancelledError
+
+from services.batch_scheduler import MicroBatchScheduler
+
+
+class RecordingBatchFn:
+    """Fake batch_fn: records each batch and returns item * 10, optionally blocking until released."""
+    def __init__(self, gate: threading.Event | None = None):
+        self.batches = []
+        self.gate = gate
+        self.started = threading.Event()
+
+    def __call__(self, items: list) -> list:
+        self.batches.append(list(items))
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [item * 10 for item in items]
+
+
+def test_flushes_when_the_batch_is_full_without_waiting_for_the_window():
+    fn = RecordingBatchFn()
+    scheduler = MicroBatchScheduler(fn, max_batch_size=4, max_wait_ms=5000)
+    try:
+        start = time.monotonic()
+        futures = [scheduler.submit(i) for i in range(4)]
+        assert [f.result(timeout=2) for f in futures] == [0, 10, 20, 30]
+        assert time.monotonic() - start < 2
+        assert fn.batches == [[0, 1, 2, 3]]
+    finally:
+        scheduler.stop()
+
+
+def test_flushes_a_partial_batch_when_the_window_closes():
+    fn = RecordingBatchFn()
+    scheduler = MicroBatchScheduler(fn, max_batch_size=16, max_wait_ms=50)
+    try:
+        futures = [scheduler.submit(i) for i in range(3)]
+        assert [f.result(timeout=2) for f in futures] == [0, 10, 20]
+        assert fn.batches == [[0, 1, 2]]
+    finally:
+        scheduler.stop()
+
+
+def test_oversized_bursts_are_split_into_max_size_batches():
+    fn = RecordingBatchFn()
+    scheduler = MicroBatchScheduler(fn, max_batch_size=3, max_wait_ms=50)
+    try:
+        futures = [scheduler.submit(i) for i in range(7)]
+        assert [f.result(timeout=2) for f in futures] == [i * 10 for i in range(7)]
+        assert [len(batch) for batch in fn.batches] == [3, 3, 1]
+    finally:
+        scheduler.stop()
+
+
+def test_each_caller_gets_its_own_result_under_concurrency():
+    fn = RecordingBatchFn()
+    scheduler = MicroBatchScheduler(fn, max_batch_size=8, max_wait_ms=20)
+    results = {}
+
+    def caller(i: int):
+        results[i] = scheduler.run(i, timeout=5)
+
+    try:
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == {i: i * 10 for i in range(40)}
+        assert len(fn.batches) < 40  # requests were actually grouped
+    finally:
+        scheduler.stop()
+
+
+def test_wrong_number_of_results_fails_every_future_in_the_batch():
+    scheduler = MicroBatchScheduler(lambda items: items[:-1], max_batch_size=3, max_wait_ms=1000)
+    try:
+        futures = [scheduler.submit(i) for i in range(3)]
+        for future in futures:
+            error = future.exception(timeout=2)
+            assert isinstance(error, RuntimeError)
+            assert "2 results for 3 items" in str(error)
+    finally:
+        scheduler.stop()
+
+
+def test_batch_fn_exception_reaches_every_caller():
+    def boom(items):
+        raise ValueError("encoder failed")
+
+    scheduler = MicroBatchScheduler(boom, max_batch_size=2, max_wait_ms=1000)
+    try:
+        futures = [scheduler.submit(i) for i in range(2)]
+        assert all(isinstance(f.exception(timeout=2), ValueError) for f in futures)
+    finally:
+        scheduler.stop()
+
+
+def test_cancelled_futures_are_skipped():
+    gate = threading.Event()
+    fn = RecordingBatchFn(gate)
+    scheduler = MicroBatchScheduler(fn, max_batch_size=1, max_wait_ms=0)
+    try:
+        # Occupy the batching thread so the next submissions stay queued
+        blocker = scheduler.submit(0)
+        assert fn.started.wait(2)
+        cancelled = scheduler.submit(1)
+        kept = scheduler.submit(2)
+        assert cancelled.cancel()
+        gate.set()
+        assert blocker.result(timeout=2) == 0
+        assert kept.result(timeout=2) == 20
+        try:
+            cancelled.result(timeout=0)
+        except CancelledError:
+            pass
+        else:
+            raise AssertionError("cancelled future returned a result")
+        assert fn.batches == [[0], [2]]
+    finally:
+        gate.set()
+        scheduler.stop()
+
+
+def test_stop_drains_queued_requests():
+    fn = RecordingBatchFn()
+    scheduler = MicroBatchScheduler(fn, max_batch_size=2, max_wait_ms=1000)
+    futures = [scheduler.submit(i) for i in range(5)]
+    scheduler.stop()
+    assert [f.result(timeout=0) for f in futures] == [0, 10, 20, 30, 40]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+    print("Micro-batch scheduler: OK")
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from services.inference_executor import InferenceExecutor, Overloaded
+
+
+def _blocking_task(gate: threading.Event):
+    """Inference stand-in that holds its slot until the gate opens."""
+    def task(value):
+        gate.wait(5)
+        return value
+    return task
+
+
+async def _until(condition, timeout: float = 2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+async def _expect_overloaded(coro) -> Overloaded:
+    try:
+        await coro
+    except Overloaded as e:
+        return e
+    raise AssertionError("expected Overloaded")
+
+
+def test_full_queue_is_rejected_with_429_and_a_backlog_based_retry_after():
+    async def run():
+        executor = InferenceExecutor(max_concurrency=2, max_queue=2, queue_timeout_ms=5000, compute_workers=2)
+        executor._service_time_ewma = 3.0
+        gate = threading.Event()
+        task = _blocking_task(gate)
+        try:
+            running = [asyncio.create_task(executor.run(task, i)) for i in range(2)]
+            await _until(lambda: executor.in_flight == 2)
+            queued = [asyncio.create_task(executor.run(task, i)) for i in range(2, 4)]
+            await _until(lambda: executor.waiting == 2)
+
+            error = await _expect_overloaded(executor.run(task, 4))
+            assert error.status_code == 429
+            # (2 waiting + 2 in flight) / 2 slots * 3 s per request
+            assert error.retry_after == 6
+            assert executor.stats()["rejected_queue_full"] == 1
+
+            gate.set()
+            assert await asyncio.gather(*running, *queued) == [0, 1, 2, 3]
+            assert executor.in_flight == 0 and executor.waiting == 0
+        finally:
+            gate.set()
+            executor.shutdown()
+    asyncio.run(run())
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def run():
+        executor = InferenceExecutor(max_concurrency=1, max_queue=4, queue_timeout_ms=100)
+        executor._service_time_ewma = 2.5
+        gate = threading.Event()
+        task = _blocking_task(gate)
+        try:
+            running = asyncio.create_task(executor.run(task, "first"))
+            await _until(lambda: executor.in_flight == 1)
+
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            error = await _expect_overloaded(executor.run(task, "second"))
+            assert error.status_code == 503
+            assert 0.09 <= loop.time() - start < 1.0
+            # (1 waiting + 1 in flight) / 1 slot * 2.5 s, rounded up
+            assert error.retry_after == 5
+            assert executor.waiting == 0
+            assert executor.stats()["rejected_deadline"] == 1
+
+            gate.set()
+            assert await running == "first"
+        finally:
+            gate.set()
+            executor.shutdown()
+    asyncio.run(run())
+
+
+def test_retry_after_is_at_least_one_second():
+    async def run():
+        executor = InferenceExecutor(max_concurrency=1, max_queue=0, queue_timeout_ms=1000)
+        executor._service_time_ewma = 0.001
+        gate = threading.Event()
+        try:
+            running = asyncio.create_task(executor.run(_blocking_task(gate), 1))
+            await _until(lambda: executor.in_flight == 1)
+            error = await _expect_overloaded(executor.run(_blocking_task(gate), 2))
+            assert error.status_code == 429 and error.retry_after == 1
+            gate.set()
+            await running
+        finally:
+            gate.set()
+            executor.shutdown()
+    asyncio.run(run())
+
+
+def test_slot_is_released_when_the_work_fails():
+    async def run():
+        executor = InferenceExecutor(max_concurrency=1, max_queue=0, queue_timeout_ms=1000)
+
+        def fail(_):
+            raise ValueError("encoder failed")
+
+        try:
+            for _ in range(3):
+                try:
+                    await executor.run(fail, None)
+                except ValueError:
+                    pass
+            assert executor.in_flight == 0
+            assert await executor.run(lambda x: x + 1, 1) == 2
+        finally:
+            executor.shutdown()
+    asyncio.run(run())
+
+
+def test_run_scheduled_holds_a_slot_until_the_future_resolves():
+    async def run():
+        executor = InferenceExecutor(max_concurrency=1, max_queue=0, queue_timeout_ms=1000)
+        future = Future()
+        try:
+            scheduled = asyncio.create_task(executor.run_scheduled(lambda item: future, "item"))
+            await _until(lambda: executor.in_flight == 1)
+            error = await _expect_overloaded(executor.run(lambda x: x, 1))
+            assert error.status_code == 429
+            future.set_result("done")
+            assert await scheduled == "done"
+            assert executor.in_flight == 0
+        finally:
+            executor.shutdown()
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+    print("Inference executor: OK")
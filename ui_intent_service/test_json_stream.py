@@ -0,0 +1,147 @@
+import os
+import json
+import asyncio
+
+os.environ.setdefault("LLM_API_KEY", "test")
+
+from services.json_stream import SectionStreamParser
+from services.llm_client import CopyStreamIncomplete, stream_marketing_copy
+from services.llm_transport import llm_transport
+
+COPY = {
+    "hero": {"heading": "Say \"hi\" to {fast} sites", "subheading": "Line\\break é \\u00e9", "cta": "Go"},
+    "featuresRow": [
+        {"title": "Charts [live]", "description": "Nested {\"a\": [1, 2]}"},
+        {"title": "Tables", "description": "Sorted, filtered"},
+    ],
+    "bentoGrid": [[1, [2, 3]], {"deep": {"deeper": ["x", {"y": None}]}}],
+    "count": 3,
+    "flag": True,
+}
+
+
+def _feed_in_chunks(text: str, size: int) -> tuple:
+    parser = SectionStreamParser()
+    yielded = []
+    for start in range(0, len(text), size):
+        yielded.extend(parser.feed(text[start:start + size]))
+    return parser, yielded
+
+
+def test_every_chunk_size_yields_each_section_once_in_order():
+    text = "```json\n" + json.dumps(COPY, indent=2) + "\n```"
+    # Size 1..7 splits keys, strings and escape sequences at every possible offset
+    for size in range(1, 8):
+        parser, yielded = _feed_in_chunks(text, size)
+        assert parser.done, size
+        assert [key for key, _ in yielded] == list(COPY), size
+        assert dict(yielded) == COPY, size
+        assert parser.sections == COPY, size
+
+
+def test_key_cut_mid_escape():
+    parser = SectionStreamParser()
+    assert parser.feed('{"he\\') == []
+    assert parser.feed('"ro": {"heading": "a\\') == []
+    assert parser.feed('"b"}') == [('he"ro', {"heading": 'a"b'})]
+    assert not parser.done
+    assert parser.feed("}") == []
+    assert parser.done
+
+
+def test_braces_and_brackets_inside_strings_do_not_change_depth():
+    parser, yielded = _feed_in_chunks('{"a": "}]{[", "b": ["}", {"c": "]"}]}', 2)
+    assert parser.done
+    assert yielded == [("a", "}]{["), ("b", ["}", {"c": "]"}])]
+
+
+def test_trailing_primitive_is_flushed_on_close():
+    parser = SectionStreamParser()
+    assert parser.feed('{"n": 1') == []
+    assert parser.feed("2}") == [("n", 12)]
+    assert parser.done
+
+
+def test_truncated_stream_keeps_finished_sections_and_is_not_done():
+    text = json.dumps(COPY)
+    cut = text.index('"bentoGrid"') + 20
+    parser, yielded = _feed_in_chunks(text[:cut], 5)
+    assert not parser.done
+    assert [key for key, _ in yielded] == ["hero", "featuresRow"]
+
+
+def test_text_after_the_object_is_ignored():
+    parser, yielded = _feed_in_chunks('{"a": 1} {"b": 2}', 3)
+    assert parser.done
+    assert yielded == [("a", 1)]
+
+
+def _fake_stream(deltas: list, error: Exception | None = None):
+    async def stream_chat_completion_content(payload, api_key, timeout=None):
+        for delta in deltas:
+            yield delta
+        if error is not None:
+            raise error
+    return stream_chat_completion_content
+
+
+def _collect(deltas: list, error: Exception | None = None) -> tuple:
+    """Runs stream_marketing_copy over fake deltas -> (yielded sections, raised exception or None)."""
+    async def run():
+        yielded = []
+        try:
+            async for section in stream_marketing_copy("saas landing page", "landing", ["hero", "featuresRow"]):
+                yielded.append(section)
+        except CopyStreamIncomplete as e:
+            return yielded, e
+        return yielded, None
+
+    original = llm_transport.stream_chat_completion_content
+    llm_transport.stream_chat_completion_content = _fake_stream(deltas, error)
+    try:
+        return asyncio.run(run())
+    finally:
+        llm_transport.stream_chat_completion_content = original
+
+
+def _deltas(text: str, size: int = 4) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_complete_stream_finishes_normally():
+    yielded, error = _collect(_deltas(json.dumps(COPY)))
+    assert error is None
+    assert dict(yielded) == COPY
+
+
+def test_early_eof_raises_after_the_finished_sections():
+    text = json.dumps(COPY)
+    yielded, error = _collect(_deltas(text[:text.index('"bentoGrid"') + 5]))
+    assert isinstance(error, CopyStreamIncomplete)
+    assert [key for key, _ in yielded] == ["hero", "featuresRow"]
+
+
+def test_transport_error_raises_incomplete():
+    text = json.dumps(COPY)
+    failure = ConnectionError("reset by peer")
+    yielded, error = _collect(_deltas(text[:text.index('"featuresRow"')]), error=failure)
+    assert isinstance(error, CopyStreamIncomplete)
+    assert error.__cause__ is failure
+    assert [key for key, _ in yielded] == ["hero"]
+
+
+def test_missing_api_key_raises_incomplete():
+    key = os.environ.pop("LLM_API_KEY")
+    try:
+        yielded, error = _collect(_deltas(json.dumps(COPY)))
+    finally:
+        os.environ["LLM_API_KEY"] = key
+    assert isinstance(error, CopyStreamIncomplete)
+    assert yielded == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+    print("JSON section streaming: OK")
@@ -1,6 +1,33 @@
 import torch
 from models.encoder import encode_text
 from models.ui_intent_model import UIIntentModel
+from models.fused_heads import FusedIntentHeads, CATEGORY_SLICE, COMPLEXITY_SLICE, COMPONENTS_SLICE
+
+def check_fused_parity(model: UIIntentModel, embeddings: torch.Tensor, atol: float = 1e-5):
+    """Asserts the fused engine (torch and NumPy paths) matches the three-head module."""
+    model = model.cpu().eval()
+    embeddings = embeddings.cpu()
+    with torch.no_grad():
+        category_logits, complexity_logits, components_logits = model(embeddings)
+        expected = torch.cat([
+            torch.softmax(category_logits, dim=1),
+            torch.softmax(complexity_logits, dim=1),
+            torch.sigmoid(components_logits),
+        ], dim=1)
+
+    # Built from the state dict exactly as stored in ui_intent_heads.pt
+    fused = FusedIntentHeads.from_state_dict(model.state_dict())
+    torch_probs = fused.probabilities_torch(embeddings)
+    numpy_probs = torch.from_numpy(fused.probabilities_numpy(embeddings.numpy()))
+
+    for name, probs in (("torch", torch_probs), ("numpy", numpy_probs)):
+        assert probs.shape == expected.shape, f"{name} path shape {tuple(probs.shape)} != {tuple(expected.shape)}"
+        max_diff = (probs - expected).abs().max().item()
+        assert max_diff <= atol, f"{name} path drifted from UIIntentModel by {max_diff:.2e}"
+        print(f"Fused {name} path max abs diff: {max_diff:.2e}")
+
+    for sl in (CATEGORY_SLICE, COMPLEXITY_SLICE):
+        assert torch.allclose(numpy_probs[:, sl].sum(dim=1), torch.ones(len(embeddings)), atol=1e-5)
 
 if __name__ == "__main__":
     # Instantiate UIIntentModel
@@ -28,3 +55,8 @@ if __name__ == "__main__":
     # Print whether embedding.requires_grad is True or False
     print("\n--- Gradient Tracking ---")
     print(f"embedding.requires_grad: {embedding.requires_grad}")
+
+    # Compare the fused inference engine against the module (random + real embeddings)
+    print("\n--- Fused Head Parity ---")
+    torch.manual_seed(0)
+    check_fused_parity(model, torch.cat([embedding.cpu(), torch.randn(63, 384)], dim=0))
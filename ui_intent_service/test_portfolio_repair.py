@@ -0,0 +1,133 @@
+import os
+import json
+import asyncio
+
+os.environ["RESUME_CACHE_PATH"] = ""
+os.environ.setdefault("LLM_API_KEY", "test")
+
+from services import resume_parser
+from services.llm_transport import llm_transport
+from services.portfolio_repair import close_truncated_json, decode_portfolio
+
+VALID = {
+    "personal": {"name": "Jordan Lee", "headline": "I build tools that make data feel simple."},
+    "about": "Engineer who turns messy data into clear products.",
+    "featured_projects": [
+        {"title": "Ledger", "one_liner": "Open-source budgeting app.", "tech_stack": ["Python"]},
+        {"title": "Pulse", "one_liner": "Realtime metrics for small teams.", "impact": "2k users"},
+    ],
+    "experience": [
+        {"role": "Engineer", "company": "Acme", "period": "2020 — Present", "impact_line": "Shipped the data platform."},
+    ],
+    "education": [{"institution": "TU Berlin", "degree": "BSc Computer Science", "year": "2018"}],
+    "skills": [{"category": "Languages", "items": ["Python", "SQL"]}],
+}
+
+
+def test_valid_output_takes_the_fast_path_unchanged():
+    portfolio = decode_portfolio(json.dumps(VALID))
+    assert portfolio["personal"]["name"] == "Jordan Lee"
+    assert [p["title"] for p in portfolio["featured_projects"]] == ["Ledger", "Pulse"]
+    assert portfolio["skills"][0]["items"] == ["Python", "SQL"]
+
+
+def test_close_truncated_json_drops_the_partial_token_and_closes_containers():
+    # The entry that was being written closes empty; the schema pass then drops it
+    assert json.loads(close_truncated_json('{"a": [1, 2, {"b": "c"}, {"d": "unfinis')) == {"a": [1, 2, {"b": "c"}, {}]}
+    assert json.loads(close_truncated_json('{"a": {"b": "x, y", "c": ')) == {"a": {"b": "x, y"}}
+    # Brackets and escaped quotes inside strings are not structure
+    assert json.loads(close_truncated_json('{"a": "[{\\"", "b": [')) == {"a": '[{"', "b": []}
+    assert close_truncated_json('{"a": 1}') == '{"a": 1}'
+
+
+def test_truncated_output_keeps_everything_before_the_cut():
+    text = json.dumps(VALID)
+    cut = text[:text.index('"education"') + 30]
+    portfolio = decode_portfolio(cut)
+    assert portfolio["about"] == VALID["about"]
+    assert len(portfolio["featured_projects"]) == 2
+    assert portfolio["experience"][0]["company"] == "Acme"
+    # The half-written education entry is dropped, not half-filled
+    assert portfolio["education"] == []
+    assert portfolio["skills"] == []
+
+
+def test_broken_last_array_entry_is_dropped():
+    data = json.loads(json.dumps(VALID))
+    data["featured_projects"].append({"title": "Half"})  # cut off before one_liner
+    portfolio = decode_portfolio(json.dumps(data))
+    assert [p["title"] for p in portfolio["featured_projects"]] == ["Ledger", "Pulse"]
+
+
+def test_missing_field_in_an_earlier_entry_is_filled():
+    data = json.loads(json.dumps(VALID))
+    del data["featured_projects"][0]["one_liner"]
+    portfolio = decode_portfolio(json.dumps(data))
+    assert [p["title"] for p in portfolio["featured_projects"]] == ["Ledger", "Pulse"]
+    assert portfolio["featured_projects"][0]["one_liner"] == ""
+
+
+def test_missing_required_submodel_is_rebuilt_from_an_empty_object():
+    data = json.loads(json.dumps(VALID))
+    del data["personal"]
+    portfolio = decode_portfolio(json.dumps(data))
+    assert portfolio["personal"]["name"] == "" and portfolio["personal"]["headline"] == ""
+    assert portfolio["personal"]["social_links"] == {
+        "github": None, "linkedin": None, "twitter": None, "website": None, "email": None,
+    }
+    assert portfolio["about"] == VALID["about"]
+
+
+def test_scalar_and_list_mix_ups_are_coerced():
+    data = json.loads(json.dumps(VALID))
+    data["about"] = ["Engineer.", "Builder."]         # list where a string is expected
+    data["featured_projects"][0]["tech_stack"] = "Rust"  # string where a list is expected
+    data["featured_projects"][1]["impact"] = 2000       # number where a string is expected
+    data["education"][0]["year"] = 2018
+    data["skills"][0]["items"] = None
+    portfolio = decode_portfolio(json.dumps(data))
+    assert portfolio["about"] == "Engineer., Builder."
+    assert portfolio["featured_projects"][0]["tech_stack"] == ["Rust"]
+    assert portfolio["featured_projects"][1]["impact"] == "2000"
+    assert portfolio["education"][0]["year"] == "2018"
+    assert portfolio["skills"][0]["items"] == []
+
+
+def test_unrepairable_output_raises_value_error():
+    for content in (
+        "Sorry, I can't help with that.",
+        '["not", "an", "object"]',
+        '{"personal": "Jordan Lee", "about": "x"}',  # a string cannot become PersonalDetails
+    ):
+        try:
+            decode_portfolio(content)
+        except ValueError:
+            continue
+        raise AssertionError(f"expected ValueError for {content!r}")
+
+
+def test_unrepairable_output_is_retried():
+    replies = ["Sorry, I can't help with that.", json.dumps(VALID)]
+    calls = []
+
+    async def chat_completion_content(payload, api_key, timeout=None):
+        calls.append(payload)
+        return replies[len(calls) - 1]
+
+    original = llm_transport.chat_completion_content
+    llm_transport.chat_completion_content = chat_completion_content
+    try:
+        portfolio, error = asyncio.run(resume_parser._transform("resume text", "test"))
+    finally:
+        llm_transport.chat_completion_content = original
+
+    assert resume_parser.RESUME_LLM_RETRIES >= 1
+    assert error is None and len(calls) == 2
+    assert portfolio["personal"]["name"] == "Jordan Lee"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+    print("Portfolio repair: OK")
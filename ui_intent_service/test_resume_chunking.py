@@ -0,0 +1,86 @@
+import os
+import re
+import json
+import asyncio
+
+# No on-disk cache, and a key so the parser calls the (faked) LLM
+os.environ["RESUME_CACHE_PATH"] = ""
+os.environ.setdefault("LLM_API_KEY", "test")
+
+from services import resume_parser
+from services.llm_transport import llm_transport
+from services.resume_chunking import chunk_resume
+from services.portfolio_repair import decode_portfolio
+from models.portfolio_schema import PortfolioChunkSchema
+
+
+def _fake_chunk_responses(calls: list):
+    """LLM stand-in: only part 1 has personal/about; later parts carry just projects and experience."""
+    async def chat_completion_content(payload, api_key, timeout=None):
+        user = payload["messages"][-1]["content"]
+        calls.append(user)
+        part = int(re.search(r"part (\d+) of \d+", user).group(1))
+        if part == 1:
+            body = {
+                "personal": {"name": "Jordan Lee", "headline": "I build tools that make data feel simple."},
+                "about": "Engineer who turns messy data into clear products.",
+                "featured_projects": [{"title": "Ledger", "one_liner": "Open-source budgeting app."}],
+            }
+        else:
+            body = {
+                "featured_projects": [{"title": f"Project {part}", "one_liner": f"Built in part {part}.", "impact": "10k users"}],
+                "experience": [{"role": f"Engineer {part}", "company": "Acme", "period": "2020", "impact_line": "Shipped it."}],
+            }
+        return json.dumps(body)
+    return chat_completion_content
+
+
+def _long_resume() -> str:
+    filler = "Worked on distributed systems, data pipelines and internal tooling for analytics teams. " * 40
+    return (
+        "Jordan Lee\nBerlin, Germany\n\nSUMMARY\n" + filler
+        + "\n\nEXPERIENCE\n" + filler
+        + "\n\nPROJECTS\n" + filler
+        + "\n\nEDUCATION\nTU Berlin, BSc Computer Science, 2018\n" + filler
+    )
+
+
+def test_later_chunks_without_personal_are_merged():
+    text = _long_resume()
+    chunks = chunk_resume(resume_parser.cleanse_text(text, resume_parser.RESUME_TEXT_MAX_CHARS),
+                          resume_parser.RESUME_CHUNK_CHARS)
+    assert len(chunks) >= 3, f"expected a multi-chunk resume, got {len(chunks)} chunk(s)"
+
+    calls = []
+    original = llm_transport.chat_completion_content
+    llm_transport.chat_completion_content = _fake_chunk_responses(calls)
+    try:
+        portfolio = asyncio.run(resume_parser.parse_resume_to_portfolio(text))
+    finally:
+        llm_transport.chat_completion_content = original
+
+    assert "error" not in portfolio, portfolio
+    # One call per chunk: no chunk failed validation and burned a retry
+    assert len(calls) == len(chunks)
+    assert portfolio["personal"]["name"] == "Jordan Lee"
+    assert portfolio["about"].startswith("Engineer")
+    titles = {p["title"] for p in portfolio["featured_projects"]}
+    for part in range(2, min(len(chunks), 5) + 1):
+        assert f"Project {part}" in titles, titles
+    roles = {e["role"] for e in portfolio["experience"]}
+    assert roles == {f"Engineer {part}" for part in range(2, len(chunks) + 1)}
+
+
+def test_chunk_schema_accepts_missing_personal_and_about():
+    part = decode_portfolio(
+        '{"featured_projects":[{"title":"Pulse","one_liner":"Realtime metrics."}]}', PortfolioChunkSchema
+    )
+    # Valid as-is: nothing is fabricated that could shadow the real header chunk during the merge
+    assert part["personal"] is None and part["about"] is None
+    assert part["featured_projects"][0]["title"] == "Pulse"
+
+
+if __name__ == "__main__":
+    test_chunk_schema_accepts_missing_personal_and_about()
+    test_later_chunks_without_personal_are_merged()
+    print("Chunked resume merge: OK")
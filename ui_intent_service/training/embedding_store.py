@@ -0,0 +1,119 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes so stale stores are rebuilt
+STORE_VERSION = 1
+
+
+def csv_content_hash(csv_file: str) -> str:
+    """SHA-256 of the raw CSV bytes."""
+    digest = hashlib.sha256()
+    with open(csv_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_labels(data: pd.DataFrame, category_map: dict, complexity_map: dict, components_list: list):
+    """
+    Converts the label columns to arrays:
+      category (N,) int64, complexity (N,) int64, components (N, len(components_list)) float32
+    """
+    category = np.array(
+        [category_map.get(str(c).strip().lower(), 0) for c in data['category']], dtype=np.int64
+    )
+    complexity = np.array(
+        [complexity_map.get(str(c).strip().lower(), 0) for c in data['complexity']], dtype=np.int64
+    )
+
+    # Components are pipe-separated, e.g., "hero|projectsGrid|contactForm"
+    components = np.zeros((len(data), len(components_list)), dtype=np.float32)
+    column_of = {name: i for i, name in enumerate(components_list)}
+    for row, components_str in enumerate(data['components']):
+        for comp in str(components_str).split('|'):
+            col = column_of.get(comp.strip())
+            if col is not None:
+                components[row, col] = 1.0
+
+    return category, complexity, components
+
+
+def store_key(csv_hash: str, encoder_id: str, category_map: dict, complexity_map: dict, components_list: list) -> str:
+    """Content key covering everything that determines the stored arrays."""
+    ident = json.dumps({
+        "version": STORE_VERSION,
+        "csv": csv_hash,
+        "encoder": encoder_id,
+        "category_map": category_map,
+        "complexity_map": complexity_map,
+        "components": components_list,
+    }, sort_keys=True)
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()[:24]
+
+
+def load_or_build(csv_file: str, cache_dir: str, category_map: dict, complexity_map: dict,
+                  components_list: list, data: pd.DataFrame | None = None, batch_size: int = 256) -> dict:
+    """
+    Returns memory-mapped arrays {embeddings, category, complexity, components} for
+    the CSV, running one batched encode pass the first time this CSV/encoder pair is seen.
+    """
+    from models.encoder import ENCODER_ID, EMBEDDING_DIM, encode_corpus
+
+    key = store_key(csv_content_hash(csv_file), ENCODER_ID, category_map, complexity_map, components_list)
+    store_dir = os.path.join(cache_dir, key)
+
+    if not os.path.exists(os.path.join(store_dir, "meta.json")):
+        if data is None:
+            data = pd.read_csv(csv_file)
+        texts = [str(t) for t in data['text']]
+
+        # Build into a temp dir and rename, so readers never see a partial store
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=cache_dir)
+        try:
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, "embeddings.npy"), mode="w+", dtype=np.float32, shape=(len(texts), EMBEDDING_DIM)
+            )
+            for start, chunk in encode_corpus(texts, batch_size=batch_size):
+                embeddings[start:start + len(chunk)] = chunk
+            embeddings.flush()
+            del embeddings
+
+            category, complexity, components = encode_labels(data, category_map, complexity_map, components_list)
+            np.save(os.path.join(tmp_dir, "category.npy"), category)
+            np.save(os.path.join(tmp_dir, "complexity.npy"), complexity)
+            np.save(os.path.join(tmp_dir, "components.npy"), components)
+
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({"csv_file": os.path.abspath(csv_file), "rows": len(texts), "encoder": ENCODER_ID}, f)
+
+            try:
+                os.rename(tmp_dir, store_dir)
+            except OSError:
+                # Another process finished the same store first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    # mmap_mode="c" (copy-on-write) keeps pages shared and lets torch.from_numpy wrap them without copying
+    return {
+        name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="c")
+        for name in ("embeddings", "category", "complexity", "components")
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    from training.dataset import DEFAULT_CATEGORY_MAP, DEFAULT_COMPLEXITY_MAP, DEFAULT_COMPONENTS, DEFAULT_CACHE_DIR
+    if len(sys.argv) < 2:
+        print("Usage: python3 -m training.embedding_store <path_to_csv>")
+    else:
+        arrays = load_or_build(sys.argv[1], DEFAULT_CACHE_DIR, DEFAULT_CATEGORY_MAP, DEFAULT_COMPLEXITY_MAP, DEFAULT_COMPONENTS)
+        print(f"Embedding store ready: {arrays['embeddings'].shape[0]} rows")
@@ -1,82 +1,319 @@
+"""
+Trainer for the intent heads (384 -> 3 / 3 / 8 linear layers).
+
+The whole dataset fits in a few hundred KB, so there is no DataLoader: the
+embeddings are loaded once as one tensor and every epoch is a single
+full-batch step (or a handful of large shuffled slices when --batch-size is
+set). Each configuration trains with early stopping on a held-out,
+category-stratified split.
+
+A sweep over lr, weight decay and loss weights runs across a spawned process
+pool, with one torch thread per worker. The data is sent to each worker once
+by the pool initializer. The best trial by validation loss is refit on all
+rows for its best epoch count. That refit is saved atomically as
+ui_intent_heads.pt, next to a JSON metrics report.
+
+Usage: python3 -m training.train data/train.csv [--lr 0.003,0.01] [--workers 4]
+"""
 import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import torch
-import torch.nn as nn
-import torch.optim as optim
-from torch.utils.data import DataLoader
+import torch.nn.functional as F
+
 from models.ui_intent_model import UIIntentModel
-from training.dataset import UIPromptDataset
-
-def train(csv_path: str, epochs: int = 10, batch_size: int = 4, lr: float = 1e-3):
-    # Setup Device
-    device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
-    print(f"Using device: {device}")
-    
-    # Load dataset
-    print(f"Loading dataset from: {csv_path}")
-    dataset = UIPromptDataset(csv_path)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
-    
-    # Load UIIntentModel & Move to device
-    model = UIIntentModel(input_size=384)
-    model = model.to(device)
-    
-    # Define Loss Functions
-    # 1. Category (multi-class: 3 classes)
-    criterion_category = nn.CrossEntropyLoss()
-    # 2. Complexity (multi-class: 3 classes)
-    criterion_complexity = nn.CrossEntropyLoss()
-    # 3. Components (multi-label: 8 independent binary classes)
-    criterion_components = nn.BCEWithLogitsLoss()
-    
-    # Define Optimizer (only model heads are updated)
-    optimizer = optim.Adam(model.parameters(), lr=lr)
-    
-    # Training Loop
-    model.train()
-    print("Starting training...")
-    for epoch in range(epochs):
-        epoch_loss = 0.0
-        
-        for batch_idx, (embeddings, cat_labels, comp_labels, component_vecs) in enumerate(dataloader):
-            # Move to device
-            embeddings = embeddings.to(device)
-            cat_labels = cat_labels.to(device)
-            comp_labels = comp_labels.to(device)
-            component_vecs = component_vecs.to(device)
-            
-            # Zero gradients
-            optimizer.zero_grad()
-            
-            # Forward pass
-            cat_logits, comp_logits, components_logits = model(embeddings)
-            
-            # Compute loss
-            loss_cat = criterion_category(cat_logits, cat_labels)
-            loss_comp = criterion_complexity(comp_logits, comp_labels)
-            loss_components = criterion_components(components_logits, component_vecs)
-            
-            # Total Loss
-            loss = loss_cat + loss_comp + loss_components
-            
-            # Backward pass & Optimize
+from training.dataset import DEFAULT_CATEGORY_MAP, DEFAULT_COMPLEXITY_MAP, DEFAULT_COMPONENTS, DEFAULT_CACHE_DIR
+
+OUTPUT_PATH = "models/ui_intent_heads.pt"
+
+DEFAULT_LRS = (3e-3, 1e-2, 3e-2)
+DEFAULT_WEIGHT_DECAYS = (0.0, 1e-4, 1e-2)
+# (category, complexity, components) loss weights. The heads share no parameters and
+# Adam normalizes each parameter's step, so scaling one head's loss barely changes
+# training; only the uniform weighting is swept by default (pass --loss-weights to add more).
+DEFAULT_LOSS_WEIGHTS = ((1.0, 1.0, 1.0),)
+
+
+def load_arrays(csv_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> dict:
+    """All rows as in-memory numpy arrays (read once from the embedding store)."""
+    from training.embedding_store import load_or_build
+    arrays = load_or_build(csv_path, cache_dir, DEFAULT_CATEGORY_MAP, DEFAULT_COMPLEXITY_MAP, DEFAULT_COMPONENTS)
+    return {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+
+def split_indices(category: np.ndarray, val_fraction: float, seed: int) -> tuple:
+    """Category-stratified train/validation split; every class keeps at least one training row."""
+    rng = np.random.default_rng(seed)
+    train_idx, val_idx = [], []
+    for label in np.unique(category):
+        rows = rng.permutation(np.flatnonzero(category == label))
+        n_val = min(int(round(len(rows) * val_fraction)), len(rows) - 1)
+        val_idx.extend(rows[:n_val])
+        train_idx.extend(rows[n_val:])
+    return np.sort(np.array(train_idx, dtype=np.int64)), np.sort(np.array(val_idx, dtype=np.int64))
+
+
+def _tensors(arrays: dict, idx: np.ndarray) -> tuple:
+    return (
+        torch.from_numpy(arrays["embeddings"][idx]),
+        torch.from_numpy(arrays["category"][idx]),
+        torch.from_numpy(arrays["complexity"][idx]),
+        torch.from_numpy(arrays["components"][idx]),
+    )
+
+
+def _losses(logits: tuple, cat, comp, components) -> tuple:
+    cat_logits, comp_logits, components_logits = logits
+    return (
+        F.cross_entropy(cat_logits, cat),
+        F.cross_entropy(comp_logits, comp),
+        F.binary_cross_entropy_with_logits(components_logits, components),
+    )
+
+
+@torch.no_grad()
+def evaluate(model: UIIntentModel, x, cat, comp, components) -> dict:
+    """Unweighted loss plus accuracy / micro-F1 per head."""
+    model.eval()
+    logits = model(x)
+    loss_cat, loss_comp, loss_components = _losses(logits, cat, comp, components)
+    cat_logits, comp_logits, components_logits = logits
+    predicted = components_logits > 0
+    actual = components > 0.5
+    tp = (predicted & actual).sum().item()
+    fp = (predicted & ~actual).sum().item()
+    fn = (~predicted & actual).sum().item()
+    return {
+        "loss": (loss_cat + loss_comp + loss_components).item(),
+        "category_acc": (cat_logits.argmax(1) == cat).float().mean().item(),
+        "complexity_acc": (comp_logits.argmax(1) == comp).float().mean().item(),
+        "components_f1": 2 * tp / max(1, 2 * tp + fp + fn),
+        "components_exact": (predicted == actual).all(1).float().mean().item(),
+    }
+
+
+def fit(train_data: tuple, config: dict, val_data: tuple | None = None, epochs: int = 500,
+        patience: int = 30, batch_size: int = 0, seed: int = 0) -> tuple:
+    """
+    Trains one model. With val_data, stops after `patience` epochs without a
+    lower validation loss and restores the best epoch's weights. Without it,
+    runs exactly `epochs` epochs (used for the final refit).
+    Returns (state_dict, best_epoch, history); without an improving epoch,
+    best_epoch is the last epoch that ran.
+    """
+    if val_data is not None and val_data[0].shape[0] == 0:
+        raise ValueError("val_data is empty; pass val_data=None to train without validation")
+    torch.manual_seed(seed)
+    x, cat, comp, components = train_data
+    w_cat, w_comp, w_components = config["loss_weights"]
+
+    model = UIIntentModel(input_size=x.shape[1])
+    optimizer = torch.optim.AdamW(model.parameters(), lr=config["lr"], weight_decay=config["weight_decay"])
+    n = x.shape[0]
+    step = batch_size if 0 < batch_size < n else n
+
+    best_loss, best_epoch, best_state = float("inf"), 0, None
+    history = []
+    epoch = 0
+    for epoch in range(1, epochs + 1):
+        model.train()
+        order = torch.randperm(n) if step < n else None
+        for start in range(0, n, step):
+            if order is None:
+                batch = (x, cat, comp, components)
+            else:
+                idx = order[start:start + step]
+                batch = (x[idx], cat[idx], comp[idx], components[idx])
+            loss_cat, loss_comp, loss_components = _losses(model(batch[0]), *batch[1:])
+            loss = w_cat * loss_cat + w_comp * loss_comp + w_components * loss_components
+            optimizer.zero_grad(set_to_none=True)
             loss.backward()
             optimizer.step()
-            
-            epoch_loss += loss.item()
-            
-        avg_loss = epoch_loss / len(dataloader)
-        print(f"Epoch [{epoch+1}/{epochs}] - Loss: {avg_loss:.4f}")
-        
-    # Save Trained Weights
-    output_path = "models/ui_intent_heads.pt"
-    # Ensure dir exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    torch.save(model.state_dict(), output_path)
-    print(f"Training complete. Weights saved to {output_path}")
 
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python3 -m training.train <path_to_csv>")
+        if val_data is None:
+            continue
+        val_loss = evaluate(model, *val_data)["loss"]
+        history.append(val_loss)
+        if val_loss < best_loss - 1e-5:
+            best_loss, best_epoch = val_loss, epoch
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        elif epoch - best_epoch >= patience:
+            break
+
+    if best_state is None:
+        best_state, best_epoch = model.state_dict(), epoch
+    return best_state, best_epoch, history
+
+
+# Sweep workers receive the arrays once via the pool initializer
+_worker_arrays = None
+
+def _init_worker(arrays: dict):
+    global _worker_arrays
+    _worker_arrays = arrays
+    # One thread per process; parallelism comes from the pool
+    torch.set_num_threads(1)
+
+def _run_trial(trial: dict) -> dict:
+    arrays = _worker_arrays
+    train_data = _tensors(arrays, trial["train_idx"])
+    val_data = _tensors(arrays, trial["val_idx"])
+    start = time.perf_counter()
+    state, best_epoch, history = fit(
+        train_data, trial["config"], val_data,
+        epochs=trial["epochs"], patience=trial["patience"], batch_size=trial["batch_size"], seed=trial["seed"],
+    )
+    model = UIIntentModel(input_size=train_data[0].shape[1])
+    model.load_state_dict(state)
+    return {
+        "config": trial["config"],
+        "best_epoch": best_epoch,
+        "epochs_run": len(history),
+        "seconds": round(time.perf_counter() - start, 3),
+        "train": evaluate(model, *train_data),
+        "val": evaluate(model, *val_data),
+    }
+
+
+def sweep_configs(lrs, weight_decays, loss_weights) -> list:
+    return [
+        {"lr": lr, "weight_decay": wd, "loss_weights": list(lw)}
+        for lr, wd, lw in itertools.product(lrs, weight_decays, loss_weights)
+    ]
+
+
+def save_state_dict(state_dict: dict, output_path: str):
+    """Writes to a temp file and renames, so serving processes never load (or mmap) a partial file."""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.tmp.{os.getpid()}"
+    torch.save(state_dict, tmp_path)
+    os.replace(tmp_path, output_path)
+
+
+def train(csv_path: str, output_path: str = OUTPUT_PATH, lrs=DEFAULT_LRS, weight_decays=DEFAULT_WEIGHT_DECAYS,
+          loss_weights=DEFAULT_LOSS_WEIGHTS, epochs: int = 500, patience: int = 30, batch_size: int = 0,
+          val_fraction: float = 0.2, workers: int | None = None, seed: int = 0, refit: bool = True) -> dict:
+    """Runs the sweep, saves the best heads to output_path and returns the metrics report."""
+    random.seed(seed)
+    np.random.seed(seed)
+    started = time.perf_counter()
+
+    print(f"Loading dataset from: {csv_path}")
+    arrays = load_arrays(csv_path)
+    train_idx, val_idx = split_indices(arrays["category"], val_fraction, seed)
+    if len(val_idx) == 0:
+        raise ValueError(
+            f"val_fraction={val_fraction} leaves no validation rows out of {len(arrays['category'])}; "
+            "early stopping and config selection need at least one"
+        )
+    print(f"Rows: {len(arrays['category'])} (train {len(train_idx)}, validation {len(val_idx)})")
+
+    configs = sweep_configs(lrs, weight_decays, loss_weights)
+    trials = [
+        {"config": config, "train_idx": train_idx, "val_idx": val_idx, "epochs": epochs,
+         "patience": patience, "batch_size": batch_size, "seed": seed}
+        for config in configs
+    ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(trials)))
+    print(f"Sweeping {len(trials)} configurations on {workers} worker(s)...")
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(arrays,),
+    ) as pool:
+        for result in pool.map(_run_trial, trials):
+            results.append(result)
+            c, v = result["config"], result["val"]
+            print(
+                f"  lr={c['lr']:g} wd={c['weight_decay']:g} w={c['loss_weights']} -> "
+                f"val loss {v['loss']:.4f} cat {v['category_acc']:.2f} cplx {v['complexity_acc']:.2f} "
+                f"comp F1 {v['components_f1']:.2f} (epoch {result['best_epoch']})"
+            )
+
+    best = min(results, key=lambda r: (r["val"]["loss"], -r["val"]["category_acc"]))
+    print(f"Best: {best['config']} at epoch {best['best_epoch']} (val loss {best['val']['loss']:.4f})")
+
+    all_idx = np.arange(len(arrays["category"]))
+    if refit:
+        # Same config and epoch count, but on every row (the validation rows are too valuable to drop)
+        state, _, _ = fit(_tensors(arrays, all_idx), best["config"], epochs=best["best_epoch"],
+                          batch_size=batch_size, seed=seed)
     else:
-        train(sys.argv[1])
+        state, _, _ = fit(_tensors(arrays, train_idx), best["config"], _tensors(arrays, val_idx),
+                          epochs=epochs, patience=patience, batch_size=batch_size, seed=seed)
+
+    model = UIIntentModel(input_size=arrays["embeddings"].shape[1])
+    model.load_state_dict(state)
+    save_state_dict(model.state_dict(), output_path)
+    with open(output_path, "rb") as f:
+        weights_hash = hashlib.sha256(f.read()).hexdigest()
+
+    report = {
+        "csv": os.path.abspath(csv_path),
+        "rows": int(len(all_idx)),
+        "train_rows": int(len(train_idx)),
+        "val_rows": int(len(val_idx)),
+        "seed": seed,
+        "batch_size": batch_size,
+        "refit_on_all_rows": refit,
+        "best": best,
+        "final_fit_all_rows": evaluate(model, *_tensors(arrays, all_idx)),
+        "trials": sorted(results, key=lambda r: r["val"]["loss"]),
+        "weights_path": output_path,
+        "weights_sha256": weights_hash,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    report_path = os.path.splitext(output_path)[0] + ".metrics.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Training complete in {report['seconds']}s. Weights saved to {output_path}, report to {report_path}")
+    return report
+
+
+def _floats(value: str) -> tuple:
+    return tuple(float(v) for v in value.split(",") if v.strip())
+
+
+def _loss_weights(value: str) -> tuple:
+    # "1:1:1,1:1:2" -> ((1, 1, 1), (1, 1, 2))
+    return tuple(tuple(float(w) for w in group.split(":")) for group in value.split(",") if group.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the intent heads with a hyperparameter sweep")
+    parser.add_argument("csv_path")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--lr", type=_floats, default=DEFAULT_LRS, help="comma-separated learning rates")
+    parser.add_argument("--weight-decay", type=_floats, default=DEFAULT_WEIGHT_DECAYS, help="comma-separated")
+    parser.add_argument("--loss-weights", type=_loss_weights, default=DEFAULT_LOSS_WEIGHTS,
+                        help="category:complexity:components triples, comma-separated")
+    parser.add_argument("--epochs", type=int, default=500, help="maximum epochs per trial")
+    parser.add_argument("--patience", type=int, default=30, help="early-stopping patience in epochs")
+    parser.add_argument("--batch-size", type=int, default=0, help="0 = full batch")
+    parser.add_argument("--val-fraction", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=None, help="sweep processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-refit", action="store_true", help="save the best trial's model instead of refitting on all rows")
+    args = parser.parse_args()
+
+    train(
+        args.csv_path, output_path=args.output, lrs=args.lr, weight_decays=args.weight_decay,
+        loss_weights=args.loss_weights, epochs=args.epochs, patience=args.patience, batch_size=args.batch_size,
+        val_fraction=args.val_fraction, workers=args.workers, seed=args.seed, refit=not args.no_refit,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Trains the cascade's hashed n-gram classifier (models/cascade.py) on the
+same CSV as the intent heads. No encoder is needed.
+
+Each head (category, complexity, and the 8 components) is a logistic
+regression over hashed word 1-2-grams plus char_wb 3-5-grams. The
+regularization strength C and a per-head temperature are picked on
+out-of-fold predictions, which also produce the coverage/accuracy table
+for choosing CASCADE_MIN_CONFIDENCE. The final model is refit on every row.
+
+Usage: python3 -m training.train_cascade data/train.csv
+"""
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+from models.cascade import (
+    CASCADE_PATH, DEFAULT_CONFIG, CascadeClassifier, featurize,
+    calibrated_probabilities, confidence,
+)
+from models.fused_heads import CATEGORY_SLICE, COMPLEXITY_SLICE, COMPONENTS_SLICE
+from training.dataset import DEFAULT_CATEGORY_MAP, DEFAULT_COMPLEXITY_MAP, DEFAULT_COMPONENTS
+from training.embedding_store import encode_labels
+
+C_GRID = (1.0, 10.0, 100.0)
+# Temperatures only soften (T >= 1). With this few rows the folds are often perfectly
+# separable, and sharpening to fit them would make vague prompts look certain.
+TEMPERATURE_GRID = np.logspace(0.0, 1.5, 61)
+THRESHOLDS = (0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99)
+
+
+def _cv(y: np.ndarray, seed: int) -> StratifiedKFold:
+    folds = min(5, int(np.bincount(y).min()))
+    return StratifiedKFold(n_splits=max(2, folds), shuffle=True, random_state=seed)
+
+
+def _multiclass_logits(X, y: np.ndarray, n_classes: int, C: float, seed: int) -> np.ndarray:
+    """Out-of-fold logits (n, n_classes); classes missing from y keep a very low logit."""
+    present = np.unique(y)
+    logits = np.full((len(y), n_classes), -20.0)
+    model = LogisticRegression(C=C, max_iter=5000)
+    logits[:, present] = cross_val_predict(model, X, y, cv=_cv(y, seed), method="decision_function")
+    return logits
+
+
+def _binary_logits(X, y: np.ndarray, C: float, seed: int) -> np.ndarray:
+    if y.min() == y.max():
+        return np.full(len(y), 20.0 if y[0] else -20.0)
+    model = LogisticRegression(C=C, max_iter=5000)
+    return cross_val_predict(model, X, y, cv=_cv(y, seed), method="decision_function")
+
+
+def _softmax_nll(logits: np.ndarray, y: np.ndarray, t: float) -> float:
+    z = logits / t
+    z = z - z.max(axis=1, keepdims=True)
+    log_probs = z - np.log(np.exp(z).sum(axis=1, keepdims=True))
+    return float(-log_probs[np.arange(len(y)), y].mean())
+
+
+def _sigmoid_nll(logits: np.ndarray, y: np.ndarray, t: float) -> float:
+    z = logits / t
+    # log(1 + e^-z) for positives, log(1 + e^z) for negatives
+    return float(np.logaddexp(0.0, np.where(y > 0.5, -z, z)).mean())
+
+
+def _fit_temperature(nll) -> tuple:
+    losses = [nll(t) for t in TEMPERATURE_GRID]
+    best = int(np.argmin(losses))
+    return float(TEMPERATURE_GRID[best]), losses[best]
+
+
+def _select_head(name: str, oof_for_c, nll_for) -> dict:
+    """Picks the C whose temperature-calibrated out-of-fold NLL is lowest."""
+    best = None
+    for C in C_GRID:
+        oof = oof_for_c(C)
+        t, loss = _fit_temperature(lambda t: nll_for(oof, t))
+        print(f"  {name}: C={C:g} T={t:.3f} out-of-fold NLL {loss:.4f}")
+        if best is None or loss < best["nll"]:
+            best = {"C": C, "temperature": t, "nll": loss, "oof_logits": oof}
+    return best
+
+
+def _fit_full(X, y: np.ndarray, C: float) -> tuple:
+    """Final fit on all rows -> (coef (k, F) or (1, F), intercept, classes)."""
+    model = LogisticRegression(C=C, max_iter=5000).fit(X, y)
+    return model.coef_, model.intercept_, model.classes_
+
+
+def train_cascade(csv_path: str, output_path: str = CASCADE_PATH, config: dict = DEFAULT_CONFIG, seed: int = 0) -> dict:
+    data = pd.read_csv(csv_path)
+    texts = [str(t) for t in data["text"]]
+    category, complexity, components = encode_labels(data, DEFAULT_CATEGORY_MAP, DEFAULT_COMPLEXITY_MAP, DEFAULT_COMPONENTS)
+    components = components.astype(np.int64)
+
+    X = featurize(texts, config)
+    n_features = X.shape[1]
+    print(f"Rows: {len(texts)}, hashed features: {n_features}")
+
+    heads = {
+        "category": _select_head(
+            "category", lambda C: _multiclass_logits(X, category, 3, C, seed),
+            lambda oof, t: _softmax_nll(oof, category, t)),
+        "complexity": _select_head(
+            "complexity", lambda C: _multiclass_logits(X, complexity, 3, C, seed),
+            lambda oof, t: _softmax_nll(oof, complexity, t)),
+        # One C and one temperature shared by the 8 component classifiers
+        "components": _select_head(
+            "components", lambda C: np.stack([_binary_logits(X, components[:, j], C, seed)
+                                              for j in range(components.shape[1])], axis=1),
+            lambda oof, t: _sigmoid_nll(oof, components, t)),
+    }
+
+    weight = np.zeros((n_features, 14), dtype=np.float32)
+    bias = np.zeros(14, dtype=np.float32)
+    for cols, y, head in ((CATEGORY_SLICE, category, heads["category"]), (COMPLEXITY_SLICE, complexity, heads["complexity"])):
+        coef, intercept, classes = _fit_full(X, y, head["C"])
+        columns = np.arange(cols.start, cols.stop)[classes]
+        weight[:, columns] = coef.T
+        bias[columns] = intercept
+        bias[np.setdiff1d(np.arange(cols.start, cols.stop), columns)] = -20.0
+    for j in range(components.shape[1]):
+        col = COMPONENTS_SLICE.start + j
+        y = components[:, j]
+        if y.min() == y.max():
+            bias[col] = 20.0 if y[0] else -20.0
+            continue
+        coef, intercept, _ = _fit_full(X, y, heads["components"]["C"])
+        weight[:, col] = coef[0]
+        bias[col] = intercept[0]
+
+    temperatures = np.array([heads[h]["temperature"] for h in ("category", "complexity", "components")], dtype=np.float32)
+    cascade = CascadeClassifier(weight, bias, temperatures, config)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    cascade.save(output_path)
+
+    # Coverage vs. accuracy of the calibrated out-of-fold predictions, per threshold
+    oof = np.concatenate([heads[h]["oof_logits"] for h in ("category", "complexity", "components")], axis=1)
+    probs = calibrated_probabilities(oof.astype(np.float32), temperatures)
+    conf = confidence(probs)
+    correct = (
+        (probs[:, CATEGORY_SLICE].argmax(axis=1) == category)
+        & (probs[:, COMPLEXITY_SLICE].argmax(axis=1) == complexity)
+        & ((probs[:, COMPONENTS_SLICE] > 0.5) == (components > 0)).all(axis=1)
+    )
+    category_correct = probs[:, CATEGORY_SLICE].argmax(axis=1) == category
+    table = []
+    for threshold in THRESHOLDS:
+        answered = conf >= threshold
+        table.append({
+            "threshold": threshold,
+            "coverage": round(float(answered.mean()), 3),
+            "all_heads_accuracy": round(float(correct[answered].mean()), 3) if answered.any() else None,
+            "category_accuracy": round(float(category_correct[answered].mean()), 3) if answered.any() else None,
+        })
+        print(f"  confidence >= {threshold:.2f}: answers {table[-1]['coverage']:.0%}, "
+              f"all heads correct {table[-1]['all_heads_accuracy']}")
+
+    report = {
+        "csv": os.path.abspath(csv_path),
+        "rows": len(texts),
+        "config": config,
+        "heads": {h: {k: v for k, v in head.items() if k != "oof_logits"} for h, head in heads.items()},
+        "out_of_fold": {
+            "all_heads_accuracy": round(float(correct.mean()), 3),
+            "category_accuracy": round(float(category_correct.mean()), 3),
+            "thresholds": table,
+        },
+        "cascade_path": output_path,
+        "cascade_id": CascadeClassifier.load(output_path).cascade_id,
+    }
+    report_path = os.path.splitext(output_path)[0] + ".metrics.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Cascade saved to {output_path}, report to {report_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the hashed n-gram cascade classifier")
+    parser.add_argument("csv_path")
+    parser.add_argument("--output", default=CASCADE_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    train_cascade(args.csv_path, output_path=args.output, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()